@@ -0,0 +1,142 @@
+"""
+Per-request cost of authentication and authorization.
+
+Serves two routes in-process: one shaped like the book routes (a role
+checker and a bearer of its own) and one without auth, then reports the
+latency added by auth and the token decodes, blocklist lookups and SQL
+statements it takes per request. Users live in an in-memory sqlite database
+unless --database-url points at a scratch database (its users table is
+created and a benchmark user added). The blocklist needs the redis of
+REDIS_URL.
+
+    python -m benchmarks.auth_overhead --requests 5000
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth import dependencies
+from src.auth.dependencies import AccessTokenBearer, RoleChecker
+from src.auth.utils import create_access_token
+from src.db.main import get_session
+from src.db.models import User
+
+counts = {"decodes": 0, "blocklist lookups": 0, "queries": 0}
+
+
+def counted(function, name):
+    def count(*args, **kwargs):
+        counts[name] += 1
+        return function(*args, **kwargs)
+
+    return count
+
+
+def make_app(session_maker) -> FastAPI:
+    app = FastAPI()
+
+    async def get_benchmark_session():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_benchmark_session
+
+    @app.get("/auth", dependencies=[Depends(RoleChecker(["admin", "user"]))])
+    async def with_auth(token_details: dict = Depends(AccessTokenBearer())):
+        return {}
+
+    @app.get("/none")
+    async def without_auth():
+        return {}
+
+    return app
+
+
+async def seed(session_maker) -> str:
+    async with session_maker() as session:
+        user = User(
+            username="bench",
+            email="bench@bookly.dev",
+            first_name="bench",
+            last_name="bench",
+            role="user",
+            is_verufied=True,
+            password_hash="x",
+        )
+        session.add(user)
+        await session.commit()
+        return create_access_token({"email": user.email, "user_uid": str(user.uid)})
+
+
+async def time_requests(client, url: str, requests: int, headers=None) -> float:
+    """Mean seconds per request"""
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / requests
+
+
+async def main(requests: int, database_url: str) -> int:
+    # an in-memory sqlite database lives as long as its one connection
+    in_memory = database_url == "sqlite+aiosqlite://"
+    engine = create_async_engine(
+        database_url, **({"poolclass": StaticPool} if in_memory else {})
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(User.__table__.create, checkfirst=True)
+    session_maker = sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+    token = await seed(session_maker)
+
+    dependencies.decode_token = counted(dependencies.decode_token, "decodes")
+    dependencies.token_in_blocklist = counted(
+        dependencies.token_in_blocklist, "blocklist lookups"
+    )
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: counts.__setitem__("queries", counts["queries"] + 1),
+    )
+
+    transport = httpx.ASGITransport(app=make_app(session_maker))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        # warm up connections and caches
+        await time_requests(client, "/auth", 50, headers)
+        await time_requests(client, "/none", 50)
+        for name in counts:
+            counts[name] = 0
+
+        with_auth = await time_requests(client, "/auth", requests, headers)
+        per_request = {name: count / requests for name, count in counts.items()}
+        without_auth = await time_requests(client, "/none", requests)
+    await engine.dispose()
+
+    print(f"with auth      {with_auth * 1e6:>9.0f} us per request")
+    print(f"without auth   {without_auth * 1e6:>9.0f} us per request")
+    print(f"auth overhead  {(with_auth - without_auth) * 1e6:>9.0f} us per request")
+    for name, count in per_request.items():
+        print(f"{name:<18} {count:>5.2f} per request")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite://")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.requests, args.database_url)))
@@ -0,0 +1,203 @@
+"""
+Query plans of the catalog filters and facet counts on a large catalog.
+
+Seeds BENCHMARK_DATABASE_URL (a scratch postgres database, its tables are
+dropped) with --books books, then prints the plan, timing and heap fetches
+of the list and facet statements for a few filter combinations. Exits with
+status 1 if any of them falls back to a sequential scan of books, or if a
+facet statement reads books other than by an index-only scan without heap
+fetches. booktag may be scanned either way, its rows are as narrow as the
+entries of its indexes.
+
+    BENCHMARK_DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.book_facets
+
+On postgres 16 and one CPU core, 1M books and 2M tag links, every facet
+statement reads books by index-only scans without heap fetches:
+
+    no filters             facets  2290 ms  ix_books_facets
+    language               facets  1504 ms  ix_books_facets
+    publisher + language   facets   132 ms  ix_books_facets, ix_books_publisher_created_at_uid
+    published range        facets  1194 ms  ix_books_facets, ix_books_published_date
+    page range             facets   715 ms  ix_books_facets, ix_books_page_count
+    tag                    facets  1443 ms  ix_books_uid_facets
+
+and every list statement is an index scan returning its page in under 12 ms.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, desc
+
+from src.books.filters import FACET_PLANNER_SETTINGS, apply_filters, facet_select
+from src.books.schemas import BookFilterModel
+from src.books.service import book_select
+from src.db.models import Book
+from src.db.pagination import DEFAULT_PAGE_SIZE
+
+TAG_COUNT = 50
+
+SCENARIOS = {
+    "no filters": BookFilterModel(),
+    "language": BookFilterModel(language="French"),
+    "publisher + language": BookFilterModel(
+        publisher="Publisher 7", language="English"
+    ),
+    "published range": BookFilterModel(
+        published_from=date(2001, 1, 1), published_to=date(2002, 12, 31)
+    ),
+    "page range": BookFilterModel(min_pages=300, max_pages=320),
+    "tag": BookFilterModel(tag="tag-3"),
+}
+
+SEED = [
+    """
+    INSERT INTO users (uid, username, email, first_name, last_name, role,
+                       is_verufied, password_hash)
+    VALUES (gen_random_uuid(), 'bench', 'bench@bookly.dev', 'bench', 'bench',
+            'user', true, 'x')
+    """,
+    """
+    INSERT INTO books (uid, title, author, publisher, published_date,
+                       page_count, language, created_at, updated_at)
+    SELECT gen_random_uuid(),
+           'Book ' || n,
+           'Author ' || (n % 20000),
+           'Publisher ' || (n % 500),
+           date '1950-01-01' + (n % 27000),
+           50 + (n::bigint * 7919) % 1200,
+           (ARRAY['English', 'English', 'English', 'French', 'German',
+                  'Spanish', 'Italian', 'Japanese'])[1 + n % 8],
+           now() - n * interval '1 second',
+           now()
+    FROM generate_series(1, :books) AS n
+    """,
+    """
+    INSERT INTO tags (uid, name, created_at)
+    SELECT gen_random_uuid(), 'tag-' || n, now()
+    FROM generate_series(0, :tags - 1) AS n
+    """,
+    """
+    INSERT INTO booktag (book_id, tag_id)
+    SELECT books.uid, tags.uid
+    FROM books
+    JOIN tags ON tags.name IN (
+        'tag-' || abs(hashtext(books.title)) % :tags,
+        'tag-' || abs(hashtext(books.author)) % :tags
+    )
+    ON CONFLICT DO NOTHING
+    """,
+]
+
+
+def list_statement(filters: BookFilterModel):
+    statement = apply_filters(book_select(), filters)
+    return statement.order_by(desc(Book.created_at), desc(Book.uid)).limit(
+        DEFAULT_PAGE_SIZE + 1
+    )
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def explain(conn, statement, *settings) -> dict:
+    sql = statement.compile(
+        dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+    )
+    # in its own transaction, like a request, so the settings stay local to it
+    async with conn.begin():
+        for setting in settings:
+            await conn.execute(setting)
+        result = await conn.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        )
+        plan = result.scalar()
+    return plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+
+
+async def seed(engine, books: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+        for statement in SEED:
+            await conn.execute(text(statement), {"books": books, "tags": TAG_COUNT})
+    # index-only scans need an up to date visibility map
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+
+async def main(books: int, skip_seed: bool) -> int:
+    url = os.environ.get("BENCHMARK_DATABASE_URL")
+    if not url:
+        print("BENCHMARK_DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    engine = create_async_engine(url)
+    if not skip_seed:
+        print(f"seeding {books} books ...")
+        await seed(engine, books)
+
+    seq_scans = heap_reads = 0
+    async with engine.connect() as conn:
+        for name, filters in SCENARIOS.items():
+            for kind, statement, settings in (
+                ("list", list_statement(filters), ()),
+                ("facets", facet_select(filters), (FACET_PLANNER_SETTINGS,)),
+            ):
+                plan = await explain(conn, statement, *settings)
+                nodes = [
+                    node
+                    for node in plan_nodes(plan["Plan"])
+                    if node.get("Relation Name") or node.get("Index Name")
+                ]
+                scans = sorted(
+                    {
+                        f"{node['Node Type']} on {node.get('Index Name') or node['Relation Name']}"
+                        for node in nodes
+                    }
+                )
+                heap_fetches = sum(node.get("Heap Fetches", 0) for node in nodes)
+                seq_scans += sum(
+                    node["Node Type"] == "Seq Scan"
+                    and node.get("Relation Name") == "books"
+                    for node in nodes
+                )
+                if kind == "facets":
+                    # counting must be served by the covering indexes alone
+                    heap_reads += sum(
+                        node.get("Relation Name") == "books"
+                        and (
+                            node["Node Type"] != "Index Only Scan"
+                            or node.get("Heap Fetches", 0) > 0
+                        )
+                        for node in nodes
+                    )
+                print(
+                    f"{name:<22} {kind:<7} {plan['Execution Time']:>9.1f} ms  "
+                    f"heap fetches {heap_fetches:<6} {', '.join(scans)}"
+                )
+    await engine.dispose()
+
+    if seq_scans:
+        print(f"{seq_scans} sequential scans of books", file=sys.stderr)
+    if heap_reads:
+        print(f"{heap_reads} facet scans reading the books heap", file=sys.stderr)
+    return 1 if seq_scans or heap_reads else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument(
+        "--skip-seed", action="store_true", help="reuse the data of a previous run"
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.books, args.skip_seed)))
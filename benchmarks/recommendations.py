@@ -0,0 +1,120 @@
+"""
+Time and memory of building the recommendations from a large review table.
+
+Feeds --reviews synthetic reviews through RatingMatrixBuilder in batches of
+RATING_BATCH_SIZE, as ReviewService.rebuild_recommendations streams them
+from postgres, then times the book similarities and the recommendations of
+a sample of users. Book popularity and user activity follow a Zipf-like
+curve, so a few books and reviewers account for most reviews, as in a
+real catalog. The database read itself is not part of the measurement.
+
+    python -m benchmarks.recommendations --reviews 10000000
+
+On one CPU core, 10M reviews of 200k books by 1M users:
+
+    matrix             52 s, 163 MB of arrays, peak rss +350 MB
+    similarities     1024 s
+    recommend        0.51 ms per user, 507 s for all users
+    peak rss         1233 MB
+
+so the nightly rebuild spends about 26 minutes in numpy, before the
+database read and the write of user_recommendations.
+"""
+
+import sys
+import time
+import uuid
+import argparse
+import resource
+
+import numpy as np
+
+from src.reviews.recommendations import RatingMatrixBuilder
+from src.reviews.service import RATING_BATCH_SIZE
+
+
+def zipf_choice(rng, size: int, count: int, exponent: float = 1.1) -> np.ndarray:
+    """`count` draws from range(size), rank r drawn about 1/r**exponent as often"""
+    weights = 1 / np.arange(1, size + 1) ** exponent
+    return rng.choice(size, size=count, p=weights / weights.sum())
+
+
+def synthetic_reviews(reviews: int, users: int, books: int, seed: int = 7):
+    """`reviews` unique (user, book, rating) index arrays"""
+    rng = np.random.default_rng(seed)
+    draws = reviews
+    while True:
+        # popular pairs repeat, draw more until enough of them are unique
+        pairs = np.unique(
+            zipf_choice(rng, users, draws, 0.8).astype(np.int64) * books
+            + zipf_choice(rng, books, draws)
+        )
+        if len(pairs) >= reviews or len(pairs) == users * books:
+            break
+        draws = draws * reviews // len(pairs) + 1
+    # shuffled, like a table read in physical order
+    pairs = rng.permutation(pairs)[:reviews]
+    ratings = rng.integers(0, 5, size=len(pairs))
+    return pairs // books, pairs % books, ratings
+
+
+def peak_rss_mb() -> float:
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(reviews: int, users: int, books: int, sample_users: int) -> int:
+    user_ids, book_ids, ratings = synthetic_reviews(reviews, users, books)
+    user_uids = [uuid.uuid4() for _ in range(users)]
+    book_uids = [uuid.uuid4() for _ in range(books)]
+    print(f"{len(ratings)} reviews of {books} books by {users} users")
+    baseline = peak_rss_mb()
+
+    started = time.perf_counter()
+    builder = RatingMatrixBuilder()
+    for start in range(0, len(ratings), RATING_BATCH_SIZE):
+        end = start + RATING_BATCH_SIZE
+        builder.add(
+            [
+                (user_uids[user], book_uids[book], int(rating))
+                for user, book, rating in zip(
+                    user_ids[start:end].tolist(),
+                    book_ids[start:end].tolist(),
+                    ratings[start:end].tolist(),
+                )
+            ]
+        )
+    matrix = builder.build()
+    built = time.perf_counter()
+    print(
+        f"matrix         {built - started:>8.1f} s  "
+        f"{matrix.nbytes / 2**20:>8.1f} MB of arrays  "
+        f"peak rss +{peak_rss_mb() - baseline:.0f} MB"
+    )
+
+    matrix.compute_neighbours()
+    neighbours = time.perf_counter()
+    print(f"similarities   {neighbours - built:>8.1f} s")
+
+    sample = np.random.default_rng(1).choice(
+        len(matrix.user_uids), size=min(sample_users, len(matrix.user_uids))
+    )
+    for user in sample:
+        matrix.recommend(int(user))
+    per_user = (time.perf_counter() - neighbours) / max(len(sample), 1)
+    print(
+        f"recommend      {per_user * 1000:>8.2f} ms per user, "
+        f"{per_user * len(matrix.user_uids):.0f} s for all users"
+    )
+    print(f"peak rss       {peak_rss_mb():>8.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reviews", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--books", type=int, default=200_000)
+    parser.add_argument("--sample-users", type=int, default=10_000)
+    args = parser.parse_args()
+    sys.exit(main(args.reviews, args.users, args.books, args.sample_users))
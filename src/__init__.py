@@ -4,6 +4,7 @@ from src.books.routes import book_router
 from src.auth.routes import auth_router
 from src.reviews.routes import review_router
 from src.tags.routes import tags_router
+from src.gql.routes import gql_router
 from contextlib import asynccontextmanager
 
 from .errors import register_all_errors
@@ -41,3 +42,4 @@ app.include_router(book_router, prefix=f"/api/{version}/books", tags=["books"])
 app.include_router(auth_router, prefix=f"/api/{version}/auth", tags=["auth"])
 app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=["reviews"])
 app.include_router(tags_router, prefix=f"/api/{version}/tags", tags=["tags"])
+app.include_router(gql_router, prefix=f"/api/{version}/graphql", tags=["graphql"])
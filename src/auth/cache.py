@@ -0,0 +1,10 @@
+from src.config import Config
+from src.db.cache import TwoTierCache
+
+# serialized UserPrincipalModel by user uid
+principal_cache = TwoTierCache(
+    "principal",
+    maxsize=Config.PRINCIPAL_CACHE_SIZE,
+    ttl=Config.PRINCIPAL_CACHE_TTL,
+    redis_ttl=Config.PRINCIPAL_CACHE_REDIS_TTL,
+)
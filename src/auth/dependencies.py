@@ -1,3 +1,4 @@
+import uuid
 from typing import Any, List
 from fastapi import Request, status, Depends
 from fastapi.security import HTTPBearer
@@ -5,9 +6,10 @@ from fastapi.security.http import HTTPAuthorizationCredentials
 from fastapi.exceptions import HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .cache import principal_cache
 from .utils import decode_token
+from .schemas import UserPrincipalModel
 from .service import UserService
-from src.db.models import User
 from src.db.main import get_session
 from src.db.redis import token_in_blocklist
 from src.errors import (
@@ -21,26 +23,32 @@ from src.errors import (
 user_service = UserService()
 
 
+async def resolve_token(request: Request, token: str) -> dict:
+    """
+    Decode a bearer token and check it against the blocklist once per
+    request. Routes stack several bearers and role checkers, the first one
+    resolves the token and the others reuse it from `request.state`.
+    """
+    resolved = getattr(request.state, "token", None)
+    if resolved is not None and resolved[0] == token:
+        return resolved[1]
+    token_data = decode_token(token)
+    if token_data is None or await token_in_blocklist(token_data["jti"]):
+        raise InvalidToken()
+    request.state.token = (token, token_data)
+    return token_data
+
+
 class TokenBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super().__init__(auto_error=auto_error)
 
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
         creds = await super().__call__(request)
-        token = creds.credentials
-        token_data = decode_token(token)
-        if not self.token_valid(token):
-            raise InvalidToken()
-        if await token_in_blocklist(token_data["jti"]):
-            raise InvalidToken()
-
+        token_data = await resolve_token(request, creds.credentials)
         self.verify_token_data(token_data)
         return token_data
 
-    def token_valid(self, token: str) -> bool:
-        token_data = decode_token(token)
-        return token_data is not None
-
     def verify_token_data(self, token_data):
         raise NotImplementedError("Please Override this method in child classes")
 
@@ -61,16 +69,41 @@ async def get_current_user(
     token_details: dict = Depends(AccessTokenBearer()),
     session: AsyncSession = Depends(get_session),
 ):
+    # the full row, for routes that need more than the principal; FastAPI
+    # resolves it once per request however many dependencies ask for it
     user_email = token_details["user"]["email"]
     user = await user_service.get_user_by_email(user_email, session)
     return user
 
 
+async def get_principal(
+    token_details: dict = Depends(AccessTokenBearer()),
+    session: AsyncSession = Depends(get_session),
+) -> UserPrincipalModel:
+    """
+    The role and verification state of the user of the token, from the
+    principal cache when possible, so authorization usually runs no query
+    """
+    user_uid = token_details["user"]["user_uid"]
+    cached = await principal_cache.get(user_uid)
+    if cached is not None:
+        return UserPrincipalModel.model_validate_json(cached)
+    generation = await principal_cache.generation(user_uid)
+    principal = await user_service.get_principal(uuid.UUID(user_uid), session)
+    if principal is None:
+        # the user was deleted after the token was issued
+        raise InvalidToken()
+    await principal_cache.set(user_uid, principal.model_dump_json(), generation)
+    return principal
+
+
 class RoleChecker:
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> Any:
+    def __call__(
+        self, current_user: UserPrincipalModel = Depends(get_principal)
+    ) -> Any:
         if not current_user.is_verufied:
             raise AccountNotVerified()
 
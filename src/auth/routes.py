@@ -1,15 +1,18 @@
+import uuid
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, status, BackgroundTasks
+from typing import List
+from fastapi import APIRouter, Depends, Query, status, BackgroundTasks
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import HTTPException
 from sqlmodel.ext.asyncio.session import AsyncSession
 from aiosmtplib.errors import SMTPResponseException
 
-from .service import UserService
+from .service import UserService, USER_LIBRARY_LOADERS
 from .schemas import (
     UserCreateModel,
     UserLoginModel,
     UserBooksModel,
+    RecommendedBookModel,
     EmailModel,
     PasswordResetRequestModel,
     PasswordResetConfirmModel,
@@ -32,12 +35,14 @@ from src.db.redis import add_jti_to_blocklist
 from src.errors import UserAlreadyExists, UserNotFound, InvalidCredentials, InvalidToken
 from src.mail import mail, create_message
 from src.celery_tasks import send_email
+from src.reviews.recommendations import RECOMMENDATION_LIMIT
 from src.config import Config
 
 
 auth_router = APIRouter()
 user_service = UserService()
 role_checker = RoleChecker(["admin", "user"])
+access_token_bearer = AccessTokenBearer()
 
 REFRESH_TOKEN_EXPIRY = 2
 
@@ -158,11 +163,27 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
     raise InvalidToken()
 
 
+@auth_router.get("/me/recommendations", response_model=List[RecommendedBookModel])
+async def get_recommendations(
+    limit: int = Query(10, ge=1, le=RECOMMENDATION_LIMIT),
+    token_details: dict = Depends(access_token_bearer),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_session),
+):
+    """Books similar to the ones the user reviewed, precomputed nightly"""
+    user_uid = uuid.UUID(token_details["user"]["user_uid"])
+    return await user_service.get_recommendations(user_uid, limit, session)
+
+
 @auth_router.get("/me", response_model=UserBooksModel)
 async def get_current_user(
-    user=Depends(get_current_user), _: bool = Depends(role_checker)
+    user=Depends(get_current_user),
+    _: bool = Depends(role_checker),
+    session: AsyncSession = Depends(get_session),
 ):
-    return user
+    return await user_service.get_user_by_email(
+        user.email, session, options=USER_LIBRARY_LOADERS
+    )
 
 
 @auth_router.get("/logout")
@@ -27,11 +27,26 @@ class UserModel(BaseModel):
     updated_at: datetime
 
 
+class UserPrincipalModel(BaseModel):
+    """The columns authorization needs, what the principal cache holds"""
+
+    uid: uuid.UUID
+    email: str
+    role: str
+    is_verufied: bool
+
+
 class UserBooksModel(UserModel):
     books: List[Book]
     reviews: List[ReviewModel]
 
 
+class RecommendedBookModel(BaseModel):
+    book: Book
+    # summed similarity to the books the user reviewed, weighted by rating
+    score: float
+
+
 class UserLoginModel(BaseModel):
     email: str = Field(max_length=40)
     password: str = Field(min_length=6)
@@ -1,18 +1,48 @@
-from sqlmodel import select
+import uuid
+from typing import Sequence
+from sqlalchemy.orm import selectinload
+from sqlmodel import desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import UserCreateModel
+from .cache import principal_cache
+from .schemas import UserCreateModel, UserPrincipalModel
 from .utils import gennerate_passwd_hash
-from src.db.models import User
+from src.db.models import Book, User, UserRecommendation
+
+# loader profile for the profile view (UserBooksModel)
+USER_LIBRARY_LOADERS = (selectinload(User.books), selectinload(User.reviews))
 
 
 class UserService:
-    async def get_user_by_email(self, email: str, session: AsyncSession):
-        statement = select(User).where(User.email == email)
+    async def get_user_by_email(
+        self, email: str, session: AsyncSession, options: Sequence = ()
+    ):
+        statement = select(User).where(User.email == email).options(*options)
         results = await session.exec(statement)
         user = results.first()
         return user
 
+    async def get_recommendations(
+        self, user_uid: uuid.UUID, limit: int, session: AsyncSession
+    ):
+        """The precomputed recommendations of a user, best first"""
+        statement = (
+            select(Book, UserRecommendation.score)
+            .join(UserRecommendation, UserRecommendation.book_uid == Book.uid)
+            .where(UserRecommendation.user_uid == user_uid)
+            .order_by(desc(UserRecommendation.score), desc(UserRecommendation.book_uid))
+            .limit(limit)
+        )
+        results = await session.exec(statement)
+        return [{"book": book, "score": score} for book, score in results.all()]
+
+    async def get_principal(self, user_uid: uuid.UUID, session: AsyncSession):
+        columns = [getattr(User, field) for field in UserPrincipalModel.model_fields]
+        statement = select(*columns).where(User.uid == user_uid)
+        results = await session.exec(statement)
+        row = results.first()
+        return UserPrincipalModel(**row._mapping) if row is not None else None
+
     async def user_exists(self, email: str, session: AsyncSession):
         user = await self.get_user_by_email(email, session)
         return True if user is not None else False
@@ -31,4 +61,7 @@ class UserService:
             setattr(user, key, value)
 
         await session.commit()
+        # verification, role and password changes apply on the next request
+        # of every worker
+        await principal_cache.invalidate(str(user.uid))
         return user
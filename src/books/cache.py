@@ -0,0 +1,10 @@
+from src.config import Config
+from src.db.cache import TwoTierCache
+
+# serialized BookDetailModel by book uid
+book_detail_cache = TwoTierCache(
+    "book_detail",
+    maxsize=Config.BOOK_CACHE_SIZE,
+    ttl=Config.BOOK_CACHE_TTL,
+    redis_ttl=Config.BOOK_CACHE_REDIS_TTL,
+)
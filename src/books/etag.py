@@ -0,0 +1,46 @@
+import hashlib
+from typing import Iterable, Optional
+
+from src.errors import BookVersionMismatch
+
+
+def book_etag(book_uid, version: int) -> str:
+    return f'"{book_uid}-{version}"'
+
+
+def page_etag(rows: Iterable, *extra) -> str:
+    """Validator for a list page, derived from the versions of its rows"""
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update(f"{row.uid}:{row.version};".encode())
+    for value in extra:
+        digest.update(f"{value};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def content_etag(content: bytes) -> str:
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def version_from_if_match(if_match: Optional[str], book_uid) -> Optional[int]:
+    """
+    The book version an If-Match header asks to update, or None when any
+    version will do. A validator for another book can never match.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    etag = if_match.split(",")[0].strip()
+    uid, _, version = etag.strip('"').rpartition("-")
+    if etag.startswith("W/") or uid != str(book_uid) or not version.isdigit():
+        raise BookVersionMismatch()
+    return int(version)
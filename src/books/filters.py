@@ -0,0 +1,130 @@
+from typing import Optional
+from sqlalchemy import Integer, String, case, cast, extract, func, literal, union_all
+from sqlmodel import select, desc
+
+from .schemas import BookFilterModel
+from src.db.models import Book, BookTag, Tag
+
+FACET_LIMIT = 20
+# the facet counts scan whole covering indexes, which the default cost of a
+# random page (4, for spinning disks) prices above a sequential scan of the
+# several times wider heap; set for the transaction of the count only
+FACET_PLANNER_SETTINGS = select(func.set_config("random_page_cost", "1.1", True))
+
+# page_count facet as (label, from, to) buckets, `to` excluded
+PAGE_COUNT_BUCKETS = (
+    ("0-99", 0, 100),
+    ("100-299", 100, 300),
+    ("300-499", 300, 500),
+    ("500+", 500, None),
+)
+
+# value each book is counted under, per facet
+FACET_VALUES = {
+    "language": Book.language,
+    "publisher": Book.publisher,
+    "published_year": cast(cast(extract("year", Book.published_date), Integer), String),
+    "page_count": case(
+        *[
+            (Book.page_count < to, label)
+            for label, _, to in PAGE_COUNT_BUCKETS
+            if to is not None
+        ],
+        else_=PAGE_COUNT_BUCKETS[-1][0],
+    ),
+    "tag": Tag.name,
+}
+
+
+def tagged_books(tag_name: str):
+    return (
+        select(BookTag.book_id)
+        .join(Tag, Tag.uid == BookTag.tag_id)
+        .where(Tag.name == tag_name)
+    )
+
+
+def filter_conditions(filters: BookFilterModel) -> dict:
+    """WHERE clauses of the filters, keyed by the facet they narrow"""
+    conditions = {}
+    if filters.language is not None:
+        conditions["language"] = [Book.language == filters.language]
+    if filters.publisher is not None:
+        conditions["publisher"] = [Book.publisher == filters.publisher]
+    published = []
+    if filters.published_from is not None:
+        published.append(Book.published_date >= filters.published_from)
+    if filters.published_to is not None:
+        published.append(Book.published_date <= filters.published_to)
+    if published:
+        conditions["published_year"] = published
+    pages = []
+    if filters.min_pages is not None:
+        pages.append(Book.page_count >= filters.min_pages)
+    if filters.max_pages is not None:
+        pages.append(Book.page_count <= filters.max_pages)
+    if pages:
+        conditions["page_count"] = pages
+    if filters.tag is not None:
+        conditions["tag"] = [Book.uid.in_(tagged_books(filters.tag))]
+    return conditions
+
+
+def apply_filters(statement, filters: BookFilterModel, skip: Optional[str] = None):
+    for facet, conditions in filter_conditions(filters).items():
+        if facet != skip:
+            statement = statement.where(*conditions)
+    return statement
+
+
+def facet_select(filters: BookFilterModel):
+    """
+    A single statement returning (facet, value, count) rows, the top
+    FACET_LIMIT values of every facet. Each facet is counted with all filters
+    but its own, so the alternatives to a selected value stay visible.
+    """
+    counts = []
+    for facet, value in FACET_VALUES.items():
+        if facet == "tag":
+            statement = tag_facet_select(filters)
+        else:
+            count = func.count()
+            statement = (
+                apply_filters(
+                    select(
+                        literal(facet, String).label("facet"),
+                        value.label("value"),
+                        count.label("count"),
+                    ),
+                    filters,
+                    skip=facet,
+                )
+                .group_by(value)
+                .order_by(desc(count), value)
+                .limit(FACET_LIMIT)
+            )
+        # wrapped so every member of the UNION can keep its own LIMIT
+        counts.append(select(*statement.subquery().c))
+    return union_all(*counts)
+
+
+def tag_facet_select(filters: BookFilterModel):
+    """
+    The tag facet, counted on the links alone and named afterwards, so the
+    books are only read to apply the other filters
+    """
+    links = select(BookTag.tag_id, func.count().label("count")).group_by(BookTag.tag_id)
+    if set(filter_conditions(filters)) - {"tag"}:
+        filtered = apply_filters(select(Book.uid), filters, skip="tag")
+        links = links.where(BookTag.book_id.in_(filtered))
+    links = links.subquery()
+    return (
+        select(
+            literal("tag", String).label("facet"),
+            Tag.name.label("value"),
+            links.c.count,
+        )
+        .join(links, links.c.tag_id == Tag.uid)
+        .order_by(desc(links.c.count), Tag.name)
+        .limit(FACET_LIMIT)
+    )
@@ -0,0 +1,129 @@
+import csv
+import json
+import codecs
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+from pydantic import ValidationError
+
+from .schemas import BookCreateModel
+from src.errors import UnsupportedImportFormat
+
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+CSV_MEDIA_TYPES = ("text/csv",)
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json")
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]):
+    row_number = 0
+    async for line in lines:
+        row_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+
+
+def parse_csv_record(lines: List[str]):
+    """
+    The values of the csv record made of `lines`, or None when the reader
+    needs more of them because a quoted value is still open
+    """
+    overrun = []
+
+    def feed():
+        for line in lines:
+            yield f"{line}\n"
+        # the reader only asks past the last line inside a quoted value
+        overrun.append(True)
+
+    values = next(csv.reader(feed()), [])
+    return None if overrun else values
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]):
+    header = None
+    row_number = 0
+    record = []
+    async for line in lines:
+        record.append(line)
+        # an open quoted value can only be closed by a line with a quote
+        if len(record) > 1 and '"' not in line:
+            continue
+        values = parse_csv_record(record)
+        if values is None:
+            continue
+        blank = len(record) == 1 and not line.strip()
+        record = []
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if blank:
+            continue
+        if len(values) != len(header):
+            yield (
+                row_number,
+                ValueError(f"expected {len(header)} values, got {len(values)}"),
+            )
+            continue
+        yield row_number, dict(zip(header, values))
+    if record:
+        yield row_number + 1, ValueError("unterminated quoted value")
+
+
+def iter_rows(media_type: str, stream: AsyncIterator[bytes]):
+    media_type = (media_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_MEDIA_TYPES:
+        return iter_csv_rows(iter_lines(stream))
+    if media_type in NDJSON_MEDIA_TYPES:
+        return iter_ndjson_rows(iter_lines(stream))
+    raise UnsupportedImportFormat()
+
+
+def validate_row(row) -> Tuple[dict, List[dict]]:
+    """Returns the insert values for a row, or the reasons it was rejected"""
+    if isinstance(row, Exception):
+        return None, [{"field": None, "message": str(row)}]
+    if not isinstance(row, dict):
+        return None, [{"field": None, "message": "row must be an object"}]
+    try:
+        book_data = BookCreateModel(**row)
+        values = book_data.model_dump()
+        values["published_date"] = datetime.strptime(
+            book_data.published_date, "%Y-%m-%d"
+        ).date()
+    except ValidationError as e:
+        return None, [
+            {"field": ".".join(str(loc) for loc in err["loc"]), "message": err["msg"]}
+            for err in e.errors()
+        ]
+    except ValueError:
+        return None, [
+            {"field": "published_date", "message": "expected a YYYY-MM-DD date"}
+        ]
+    return values, []
+
+
+def report_failure(report: dict, row_number: int, errors: List[dict]) -> None:
+    """Count a rejected row, keeping the first MAX_REPORTED_ERRORS reasons"""
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row_number, "errors": errors})
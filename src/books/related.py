@@ -0,0 +1,80 @@
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# related books kept per book, the most GET /books/{uid}/related returns
+RELATED_LIMIT = 20
+# tags on more books than this ("fiction") say little about how two books
+# relate and would make all their books candidates of each other, they are
+# left out of the matrix
+MAX_TAG_BOOKS = 1000
+
+
+def csr(rows: np.ndarray, cols: np.ndarray, n_rows: int):
+    """The (indptr, indices) of the compressed sparse rows of a 0/1 matrix"""
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[np.argsort(rows, kind="stable")]
+
+
+def positions(indptr: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """The positions of the entries of several rows, concatenated"""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    # every entry is its row start plus its position within the row
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """The column indices of several rows, concatenated"""
+    return indices[positions(indptr, rows)]
+
+
+class TagMatrix:
+    """
+    The binary book x tag matrix, stored as compressed sparse rows both ways
+    (the tags of a book, the books of a tag), so the books sharing a tag with
+    a book are gathered from two slices.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> None:
+        self.book_index: Dict[uuid.UUID, int] = {}
+        tag_index: Dict[uuid.UUID, int] = {}
+        rows, cols = [], []
+        for book_uid, tag_uid in pairs:
+            rows.append(self.book_index.setdefault(book_uid, len(self.book_index)))
+            cols.append(tag_index.setdefault(tag_uid, len(tag_index)))
+        self.book_uids = list(self.book_index)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        self.book_indptr, self.book_tags = csr(rows, cols, len(self.book_index))
+        self.tag_indptr, self.tag_books = csr(cols, rows, len(tag_index))
+        self.degree = np.diff(self.book_indptr)
+
+    def similarity(self, book: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The books sharing a tag with `book` and their Jaccard similarity"""
+        tags = self.book_tags[self.book_indptr[book] : self.book_indptr[book + 1]]
+        candidates = gather(self.tag_indptr, self.tag_books, tags)
+        others, shared = np.unique(candidates, return_counts=True)
+        keep = others != book
+        others, shared = others[keep], shared[keep]
+        return others, shared / (self.degree[book] + self.degree[others] - shared)
+
+    def related(
+        self, book_uid: uuid.UUID, limit: Optional[int] = RELATED_LIMIT
+    ) -> List[Tuple[uuid.UUID, float]]:
+        """The `limit` books most similar to a book, best first"""
+        book = self.book_index.get(book_uid)
+        if book is None:
+            return []
+        others, scores = self.similarity(book)
+        if limit is not None and len(others) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            others, scores = others[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [
+            (self.book_uids[other], float(score))
+            for other, score in zip(others[order], scores[order])
+        ]
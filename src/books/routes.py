@@ -1,11 +1,51 @@
-from typing import List
-from fastapi import APIRouter, status, Depends
+import uuid
+from typing import List, Literal, Optional, Union
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    status,
+    Depends,
+    Header,
+    Query,
+    Request,
+)
 from fastapi.exceptions import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import Book, BookCreateModel, BookUpdateModel, BookDetailModel
+from .schemas import (
+    Book,
+    BookCreateModel,
+    BookUpdateModel,
+    BookDetailModel,
+    BookFacetsModel,
+    BookFilterModel,
+    BookPageModel,
+    BookProjectionModel,
+    BookProjectionPageModel,
+    BookImportReportModel,
+    BookBulkDeleteModel,
+    BookBulkDeleteResultModel,
+    BookBatchModel,
+    BookBatchResultModel,
+    TrendingBookModel,
+    RelatedBookModel,
+    SimilarBookModel,
+    AutocompleteSuggestionModel,
+)
+from .etag import book_etag, content_etag, etag_matches, version_from_if_match
+from .importer import iter_rows
+from .views import record_view, trending
+from .related import RELATED_LIMIT
+from .similar import SimilarIndex
+from src.config import Config
 from src.db.main import get_session
-from src.books.service import BookService
+from src.db.export import EXPORT_MEDIA_TYPES
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.books.cache import book_detail_cache
+from src.books.service import BookService, parse_fields
 from src.auth.dependencies import AccessTokenBearer, RoleChecker
 from src.errors import BookNotFound
 
@@ -13,27 +53,150 @@ book_router = APIRouter()
 book_service = BookService()
 access_token_bearer = AccessTokenBearer()
 role_checker = Depends(RoleChecker(["admin", "user"]))
+admin_role_checker = Depends(RoleChecker(["admin"]))
+similar_index = SimilarIndex(Config.SIMILAR_INDEX_DIR)
+fields_query = Query(
+    None,
+    description="Comma separated book fields to return, e.g. `title,author`",
+)
 
 
-@book_router.get("", response_model=List[Book], dependencies=[role_checker])
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def page_response(
+    page: dict, response: Response, if_none_match: Optional[str], projected: bool
+):
+    etag = page.pop("etag")
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if projected:
+        return JSONResponse(content=jsonable_encoder(page), headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return page
+
+
+@book_router.get(
+    "",
+    response_model=Union[BookPageModel, BookProjectionPageModel],
+    dependencies=[role_checker],
+)
 async def get_all_books(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = fields_query,
+    sort: Literal["newest", "rating", "review_count"] = "newest",
+    filters: BookFilterModel = Depends(),
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    selected = parse_fields(fields)
+    books = await book_service.get_all_books(
+        session,
+        limit=limit,
+        cursor=cursor,
+        fields=selected,
+        sort=sort,
+        filters=filters,
+    )
+    return page_response(books, response, if_none_match, selected is not None)
+
+
+@book_router.get("/facets", response_model=BookFacetsModel, dependencies=[role_checker])
+async def get_book_facets(
+    filters: BookFilterModel = Depends(),
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ):
-    books = await book_service.get_all_books(session)
-    return books
+    return await book_service.get_book_facets(filters, session)
 
 
 @book_router.get(
-    "/user/{user_uid}", response_model=List[Book], dependencies=[role_checker]
+    "/user/{user_uid}",
+    response_model=Union[BookPageModel, BookProjectionPageModel],
+    dependencies=[role_checker],
 )
 async def get_user_book_submissions(
-    user_uid: str,
+    response: Response,
+    user_uid: uuid.UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = fields_query,
+    if_none_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    selected = parse_fields(fields)
+    books = await book_service.get_user_books(
+        user_uid, session, limit=limit, cursor=cursor, fields=selected
+    )
+    return page_response(books, response, if_none_match, selected is not None)
+
+
+@book_router.get("/export", dependencies=[admin_role_checker])
+async def export_books(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    token_details: dict = Depends(access_token_bearer),
+):
+    return StreamingResponse(
+        book_service.export_books(format), media_type=EXPORT_MEDIA_TYPES[format]
+    )
+
+
+@book_router.get("/cache/stats", dependencies=[admin_role_checker])
+async def get_book_cache_stats():
+    return book_detail_cache.stats()
+
+
+@book_router.get(
+    "/autocomplete",
+    response_model=List[AutocompleteSuggestionModel],
+    dependencies=[role_checker],
+)
+async def autocomplete(
+    prefix: str = Query(min_length=1, max_length=100),
+    limit: int = Query(5, ge=1, le=20),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """Suggestions for a search box, up to `limit` of each kind"""
+    suggestions = await book_service.autocomplete(prefix, limit, session)
+    return suggestions
+
+
+@book_router.get(
+    "/trending", response_model=List[TrendingBookModel], dependencies=[role_checker]
+)
+async def get_trending_books(
+    window: Literal["hour", "day", "week"] = "week",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    ranking = await trending(window, limit)
+    result = await book_service.get_books([uid for uid, _, _ in ranking], session)
+    return [
+        {"book": book, "score": score, "unique_viewers": unique_viewers}
+        for book, (_, score, unique_viewers) in zip(result["items"], ranking)
+        if book is not None
+    ]
+
+
+@book_router.get("/search", response_model=BookPageModel, dependencies=[role_checker])
+async def search_books(
+    response: Response,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ):
-    books = await book_service.get_user_books(user_uid, session)
-    return books
+    books = await book_service.search_books(q, session, limit=limit, cursor=cursor)
+    return page_response(books, response, if_none_match, projected=False)
 
 
 @book_router.post(
@@ -52,32 +215,168 @@ async def create_a_books(
     return new_book
 
 
+@book_router.post(
+    "/import",
+    response_model=BookImportReportModel,
+    dependencies=[admin_role_checker],
+)
+async def import_books(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """
+    Bulk import books from a CSV (with a header row) or NDJSON request body.
+    Rows are validated as they stream in; invalid ones are reported back
+    with their row number instead of failing the whole import.
+    """
+    rows = iter_rows(request.headers.get("content-type"), request.stream())
+    user_id = token_details.get("user")["user_uid"]
+    report = await book_service.import_books(rows, user_id, session)
+    return report
+
+
+@book_router.post(
+    "/bulk-delete",
+    response_model=BookBulkDeleteResultModel,
+    dependencies=[admin_role_checker],
+)
+async def delete_books(
+    delete_data: BookBulkDeleteModel,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    result = await book_service.delete_books(delete_data.uids, session)
+    return result
+
+
+@book_router.post(
+    "/batch", response_model=BookBatchResultModel, dependencies=[role_checker]
+)
+async def get_books_batch(
+    batch_data: BookBatchModel,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """Fetch up to 100 books in one call, e.g. to render a shelf"""
+    result = await book_service.get_books(
+        batch_data.uids, session, include=batch_data.include
+    )
+    return result
+
+
 @book_router.get(
-    "/{book_uid}", response_model=BookDetailModel, dependencies=[role_checker]
+    "/{book_uid}",
+    response_model=Union[BookDetailModel, BookProjectionModel],
+    dependencies=[role_checker],
 )
 async def get_book(
-    book_uid: str,
+    book_uid: uuid.UUID,
+    background_tasks: BackgroundTasks,
+    fields: Optional[str] = fields_query,
+    if_none_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ) -> dict:
+    selected = parse_fields(fields)
+    viewer_uid = token_details["user"]["user_uid"]
+    if selected is None:
+        if if_none_match is not None:
+            # revalidation only needs the version, not the reviews and tags
+            version = await book_service.get_book_version(book_uid, session)
+            if version is None:
+                raise BookNotFound()
+            if etag_matches(if_none_match, book_etag(book_uid, version)):
+                background_tasks.add_task(record_view, book_uid, viewer_uid)
+                return not_modified(book_etag(book_uid, version))
+        book_detail = await book_service.get_book_detail_json(book_uid, session)
+        if book_detail is None:
+            raise BookNotFound()
+        # counted once the response is sent, off the request path
+        background_tasks.add_task(record_view, book_uid, viewer_uid)
+        version, payload = book_detail
+        return Response(
+            content=payload,
+            media_type="application/json",
+            headers={"ETag": book_etag(book_uid, version)},
+        )
+
+    book = await book_service.get_book(book_uid, session, fields=selected)
+    if not book:
+        raise BookNotFound()
+    # a projection is one indexed row, so its validator is a content hash
+    response = JSONResponse(content=jsonable_encoder(book))
+    etag = content_etag(response.body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return response
+
+
+@book_router.get(
+    "/{book_uid}/related",
+    response_model=List[RelatedBookModel],
+    dependencies=[role_checker],
+)
+async def get_related_books(
+    book_uid: uuid.UUID,
+    limit: int = Query(10, ge=1, le=RELATED_LIMIT),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """Books sharing the most tags with this one, precomputed"""
+    related = await book_service.get_related_books(book_uid, limit, session)
+    if not related and await book_service.get_book_version(book_uid, session) is None:
+        raise BookNotFound()
+    return related
+
+
+@book_router.get(
+    "/{book_uid}/similar",
+    response_model=List[SimilarBookModel],
+    dependencies=[role_checker],
+)
+async def get_similar_books(
+    book_uid: uuid.UUID,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+):
+    """Books with the most similar title, author and publisher"""
     book = await book_service.get_book(book_uid, session)
-    if book:
-        return book
-    else:
+    if not book:
         raise BookNotFound()
+    # scanning the index is numpy work, kept off the event loop
+    ranking = await run_in_threadpool(similar_index.similar, book, limit)
+    result = await book_service.get_books([uid for uid, _ in ranking], session)
+    return [
+        {"book": similar, "score": score}
+        for similar, (_, score) in zip(result["items"], ranking)
+        if similar is not None
+    ]
 
 
 @book_router.patch("/{book_uid}", response_model=Book, dependencies=[role_checker])
 async def update_book(
-    book_uid: str,
+    response: Response,
+    book_uid: uuid.UUID,
     book_update_data: BookUpdateModel,
+    if_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ) -> dict:
-    updated_book = await book_service.update_book(book_uid, book_update_data, session)
+    """
+    Send the ETag of the book you edited as If-Match; the update is rejected
+    with a 412 if the book changed since.
+    """
+    expected_version = version_from_if_match(if_match, book_uid)
+    updated_book = await book_service.update_book(
+        book_uid, book_update_data, session, expected_version=expected_version
+    )
     if updated_book is None:
         raise BookNotFound()
     else:
+        response.headers["ETag"] = book_etag(book_uid, updated_book["version"])
         return updated_book
 
 
@@ -85,7 +384,7 @@ async def update_book(
     "/{book_uid}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[role_checker]
 )
 async def dalete_book(
-    book_uid: str,
+    book_uid: uuid.UUID,
     session: AsyncSession = Depends(get_session),
     token_details: dict = Depends(access_token_bearer),
 ) -> None:
@@ -1,7 +1,7 @@
 import uuid
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime, date
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from src.reviews.schemas import ReviewModel
 from src.tags.schemas import TagModel
@@ -17,9 +17,65 @@ class Book(BaseModel):
     language: str
     created_at: datetime
     updated_at: datetime
+    version: int
+    review_count: int
+    rating_sum: int
+    average_rating: float
+
+
+class BookPageModel(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str]
+
+
+class BookProjectionModel(BaseModel):
+    # a book read with `fields=`, only the selected fields are returned
+    uid: Optional[uuid.UUID] = None
+    title: Optional[str] = None
+    author: Optional[str] = None
+    publisher: Optional[str] = None
+    published_date: Optional[date] = None
+    page_count: Optional[int] = None
+    language: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None
+    review_count: Optional[int] = None
+    rating_sum: Optional[int] = None
+    average_rating: Optional[float] = None
+
+
+class BookProjectionPageModel(BaseModel):
+    items: List[BookProjectionModel]
+    next_cursor: Optional[str]
+
+
+class BookFilterModel(BaseModel):
+    language: Optional[str] = None
+    publisher: Optional[str] = None
+    published_from: Optional[date] = None
+    published_to: Optional[date] = None
+    min_pages: Optional[int] = Field(None, ge=0)
+    max_pages: Optional[int] = Field(None, ge=0)
+    tag: Optional[str] = None
+
+
+class FacetCountModel(BaseModel):
+    value: str
+    count: int
+
+
+class BookFacetsModel(BaseModel):
+    language: List[FacetCountModel]
+    publisher: List[FacetCountModel]
+    published_year: List[FacetCountModel]
+    page_count: List[FacetCountModel]
+    tag: List[FacetCountModel]
 
 
 class BookDetailModel(Book):
+    # number of reviews per rating, index 0 counts the 0-rated ones
+    rating_histogram: List[int]
     reviews: List[ReviewModel]
     tags: List[TagModel]
 
@@ -33,9 +89,72 @@ class BookCreateModel(BaseModel):
     language: str
 
 
+class BookImportErrorModel(BaseModel):
+    row: int
+    errors: List[dict]
+
+
+class BookImportReportModel(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BookImportErrorModel]
+
+
 class BookUpdateModel(BaseModel):
     title: str
     author: str
     publisher: str
     page_count: int
     language: str
+
+
+class BookBulkDeleteModel(BaseModel):
+    uids: List[uuid.UUID] = Field(min_length=1, max_length=5000)
+
+
+class BookBulkDeleteResultModel(BaseModel):
+    deleted: List[uuid.UUID]
+    missing: List[uuid.UUID]
+
+
+class BookBatchModel(BaseModel):
+    uids: List[uuid.UUID] = Field(min_length=1, max_length=100)
+    include: List[Literal["reviews", "tags"]] = []
+
+
+class BookBatchItemModel(Book):
+    # only set for the relations listed in `include`
+    reviews: Optional[List[ReviewModel]] = None
+    tags: Optional[List[TagModel]] = None
+
+
+class BookBatchResultModel(BaseModel):
+    # one entry per requested uid, in request order, null for misses
+    items: List[Optional[BookBatchItemModel]]
+    missing: List[uuid.UUID]
+
+
+class RelatedBookModel(BaseModel):
+    book: Book
+    # Jaccard similarity of the tags of the two books
+    score: float
+
+
+class SimilarBookModel(BaseModel):
+    book: Book
+    # cosine similarity of the title, author and publisher vectors
+    score: float
+
+
+class TrendingBookModel(BaseModel):
+    book: Book
+    # views of the window, older hours weighing less
+    score: float
+    unique_viewers: int
+
+
+class AutocompleteSuggestionModel(BaseModel):
+    kind: Literal["title", "author", "tag"]
+    value: str
+    # the book of a title, the tag of a tag name, null for authors
+    uid: Optional[uuid.UUID]
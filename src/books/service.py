@@ -1,32 +1,643 @@
+import uuid
+from typing import List, Optional, Sequence
 from datetime import datetime
+from sqlalchemy import (
+    bindparam,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    null,
+    or_,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import selectinload
 from sqlmodel import select, desc
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import BookCreateModel, BookUpdateModel
-from src.db.models import Book
+from .importer import IMPORT_CHUNK_SIZE, report_failure, validate_row
+from .cache import book_detail_cache
+from .etag import page_etag
+from .views import drain_pending_views
+from .related import MAX_TAG_BOOKS, RELATED_LIMIT, TagMatrix
+from .similar import BUILD_BATCH_SIZE, IndexWriter
+from .filters import (
+    FACET_PLANNER_SETTINGS,
+    FACET_VALUES,
+    apply_filters,
+    facet_select,
+)
+from .schemas import (
+    Book as BookSchema,
+    BookBatchItemModel,
+    BookCreateModel,
+    BookDetailModel,
+    BookFilterModel,
+    BookUpdateModel,
+)
+from src.config import Config
+from src.db.export import stream_export
+from src.db.models import Book, BookTag, RelatedBook, Review, Tag, RATINGS
+from src.db.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
+from src.errors import InvalidFieldSelection, BookVersionMismatch
+
+BOOK_FIELDS = tuple(BookSchema.model_fields)
+BULK_DELETE_BATCH_SIZE = 500
+REPAIR_BATCH_SIZE = 1000
+RELATED_INSERT_BATCH_SIZE = 5000
+
+# list orders -> (sort column, cursor value parser). Rows are returned by the
+# column descending with uid as the tie breaker, each order has a matching
+# (column, uid) index
+BOOK_SORTS = {
+    "newest": ("created_at", datetime.fromisoformat),
+    "rating": ("average_rating", float),
+    "review_count": ("review_count", int),
+}
+
+# loader profile for the detail view (BookDetailModel)
+BOOK_DETAIL_LOADERS = (selectinload(Book.reviews), selectinload(Book.tags))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Turn a `fields=title,author` query value into a list of Book columns"""
+    if fields is None:
+        return None
+    selected = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not selected or any(field not in BOOK_FIELDS for field in selected):
+        raise InvalidFieldSelection()
+    return selected
+
+
+def book_select(fields: Optional[List[str]] = None, sort: str = "newest"):
+    if fields is None:
+        return select(Book)
+    # uid, the sort column and version are always read so the keyset cursor
+    # and the page ETag can be built
+    sort_column, _ = BOOK_SORTS[sort]
+    columns = dict.fromkeys(["uid", sort_column, "version", *fields])
+    return select(*[getattr(Book, column) for column in columns])
+
+
+def informative_tags(book_uids=None):
+    """The tags on at most MAX_TAG_BOOKS books, only those of `book_uids` if given"""
+    statement = (
+        select(BookTag.tag_id)
+        .group_by(BookTag.tag_id)
+        .having(func.count() <= MAX_TAG_BOOKS)
+    )
+    if book_uids is not None:
+        statement = statement.where(
+            BookTag.tag_id.in_(
+                select(BookTag.tag_id).where(BookTag.book_id.in_(book_uids))
+            )
+        )
+    return statement
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def project(row, fields: List[str]) -> dict:
+    return {field: getattr(row, field) for field in fields}
 
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
-        statement = select(Book).order_by(desc(Book.created_at))
+    async def _paginate(
+        self,
+        statement,
+        limit: int,
+        cursor: Optional[str],
+        session: AsyncSession,
+        fields: Optional[List[str]] = None,
+        sort: str = "newest",
+    ):
+        # keyset over (sort column, uid): every page is an index range scan
+        # that starts right after the last row of the previous one
+        sort_column, parse_value = BOOK_SORTS[sort]
+        column = getattr(Book, sort_column)
+        after = decode_cursor(cursor, parse_value, uuid.UUID)
+        if after is not None:
+            statement = statement.where(tuple_(column, Book.uid) < tuple(after))
+        statement = statement.order_by(desc(column), desc(Book.uid)).limit(limit + 1)
         results = await session.exec(statement)
-        return results.all()
+        books = results.all()
 
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
-        statement = (
-            select(Book)
-            .where(Book.user_uid == user_uid)
-            .order_by(desc(Book.created_at))
+        next_cursor = None
+        if len(books) > limit:
+            books = books[:limit]
+            last = books[-1]
+            next_cursor = encode_cursor(getattr(last, sort_column), last.uid)
+        etag = page_etag(books, next_cursor, fields)
+        if fields is not None:
+            books = [project(row, fields) for row in books]
+        return {"items": books, "next_cursor": next_cursor, "etag": etag}
+
+    async def get_all_books(
+        self,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        sort: str = "newest",
+        filters: Optional[BookFilterModel] = None,
+    ):
+        statement = book_select(fields, sort)
+        if filters is not None:
+            statement = apply_filters(statement, filters)
+        return await self._paginate(statement, limit, cursor, session, fields, sort)
+
+    async def get_book_facets(self, filters: BookFilterModel, session: AsyncSession):
+        await session.exec(FACET_PLANNER_SETTINGS)
+        results = await session.exec(facet_select(filters))
+        facets = {facet: [] for facet in FACET_VALUES}
+        for facet, value, count in results.all():
+            facets[facet].append({"value": value, "count": count})
+        return facets
+
+    async def get_user_books(
+        self,
+        user_uid: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ):
+        statement = book_select(fields).where(Book.user_uid == user_uid)
+        return await self._paginate(statement, limit, cursor, session, fields)
+
+    def export_books(self, export_format: str):
+        statement = select(*[getattr(Book, field) for field in BOOK_FIELDS]).order_by(
+            Book.created_at, Book.uid
         )
+        return stream_export(statement, export_format)
+
+    async def search_books(
+        self,
+        query: str,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        search_vector = Book.__table__.c.search_vector
+        tsquery = func.websearch_to_tsquery(literal_column("'english'"), query)
+        rank = func.ts_rank(search_vector, tsquery)
+        # the match is answered by the GIN index, ranking only touches hits
+        statement = book_select(list(BOOK_FIELDS)).add_columns(rank.label("rank"))
+        statement = statement.where(search_vector.op("@@")(tsquery))
+
+        after = decode_cursor(cursor, float, uuid.UUID)
+        if after is not None:
+            statement = statement.where(tuple_(rank, Book.uid) < tuple(after))
+        statement = statement.order_by(desc(rank), desc(Book.uid)).limit(limit + 1)
         results = await session.exec(statement)
-        return results.all()
+        rows = results.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].rank, rows[-1].uid)
+        return {
+            "items": [project(row, BOOK_FIELDS) for row in rows],
+            "next_cursor": next_cursor,
+            "etag": page_etag(rows, next_cursor),
+        }
+
+    async def autocomplete(self, prefix: str, limit: int, session: AsyncSession):
+        """
+        Titles, authors and tag names starting with `prefix`, ignoring case,
+        in one round trip. Each part is an ordered range scan of its
+        lower(...) COLLATE "C" index that stops after `limit` rows.
+        """
+        pattern = f"{escape_like(prefix.lower())}%"
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
-        statement = select(Book).where(Book.uid == book_uid)
+        def lower(column):
+            # the expression of the index, to match and to order on
+            return func.lower(column).collate("C")
+
+        def matching(column):
+            return lower(column).like(pattern, escape="\\")
+
+        lower_author = lower(Book.author)
+        parts = [
+            select(literal("title").label("kind"), Book.title, Book.uid)
+            .where(matching(Book.title))
+            .order_by(lower(Book.title)),
+            # typed, a bare NULL is text to postgres and cannot UNION with uuid
+            select(
+                literal("author"), func.min(Book.author), cast(null(), Book.uid.type)
+            )
+            .where(matching(Book.author))
+            .group_by(lower_author)
+            .order_by(lower_author),
+            select(literal("tag"), Tag.name, Tag.uid)
+            .where(matching(Tag.name))
+            .order_by(lower(Tag.name)),
+        ]
+        statement = union_all(
+            *[select(*part.limit(limit).subquery().c) for part in parts]
+        )
+        results = await session.exec(statement)
+        return [
+            {"kind": kind, "value": value, "uid": uid}
+            for kind, value, uid in results.all()
+        ]
+
+    async def get_book(
+        self,
+        book_uid: str,
+        session: AsyncSession,
+        fields: Optional[List[str]] = None,
+        options: Sequence = (),
+    ):
+        statement = book_select(fields).where(Book.uid == book_uid)
+        if fields is None:
+            statement = statement.options(*options)
         results = await session.exec(statement)
         book = results.first()
+        if book is not None and fields is not None:
+            return project(book, fields)
         return book if book is not None else None
 
+    async def get_books(
+        self, book_uids: List[uuid.UUID], session: AsyncSession, include=()
+    ):
+        """
+        Load many books with one query, plus one batched query per relation
+        in `include`. Results follow the order of `book_uids`.
+        """
+        statement = (
+            select(Book)
+            .where(Book.uid.in_(set(book_uids)))
+            .options(*[selectinload(getattr(Book, relation)) for relation in include])
+        )
+        results = await session.exec(statement)
+        books = {book.uid: book for book in results.all()}
+
+        items = []
+        for book_uid in book_uids:
+            book = books.get(book_uid)
+            if book is not None:
+                # relations left out of `include` are not loaded, so they are
+                # passed explicitly instead of read off the instance
+                book = BookBatchItemModel.model_validate(
+                    {
+                        **BookSchema.model_validate(
+                            book, from_attributes=True
+                        ).model_dump(),
+                        **{relation: getattr(book, relation) for relation in include},
+                    },
+                    from_attributes=True,
+                )
+            items.append(book)
+        missing = [uid for uid in dict.fromkeys(book_uids) if uid not in books]
+        return {"items": items, "missing": missing}
+
+    async def get_book_version(self, book_uid: str, session: AsyncSession):
+        statement = select(Book.version).where(Book.uid == book_uid)
+        results = await session.exec(statement)
+        return results.first()
+
+    async def get_book_detail_json(self, book_uid: str, session: AsyncSession):
+        """
+        Serialized BookDetailModel and the version it was built from, read
+        through the book detail cache. Returns None if the book is missing.
+        """
+        # cached as "<version> <json>" so hits need no parsing
+        cached = await book_detail_cache.get(str(book_uid))
+        if cached is not None:
+            version, _, payload = cached.partition(" ")
+            return int(version), payload
+        generation = await book_detail_cache.generation(str(book_uid))
+        book = await self.get_book(book_uid, session, options=BOOK_DETAIL_LOADERS)
+        if book is None:
+            return None
+        book_detail = BookDetailModel.model_validate(book, from_attributes=True)
+        payload = book_detail.model_dump_json()
+        await book_detail_cache.set(
+            str(book_uid), f"{book.version} {payload}", generation
+        )
+        return book.version, payload
+
+    async def touch_books(self, session: AsyncSession, *book_uids):
+        """
+        Bump the version of books whose detail changed through a related
+        row (review, tag). Runs in the caller's transaction and returns the
+        uids of the books that exist.
+        """
+        if not book_uids:
+            return []
+        statement = (
+            update(Book)
+            .where(Book.uid.in_(book_uids))
+            .values(version=Book.version + 1)
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        return results.scalars().all()
+
+    async def lock_book(self, session: AsyncSession, book_uid) -> bool:
+        """
+        Lock a book row until the end of the caller's transaction. Returns
+        False if the book does not exist.
+        """
+        statement = select(Book.uid).where(Book.uid == book_uid).with_for_update()
+        results = await session.exec(statement)
+        return results.first() is not None
+
+    async def adjust_rating_aggregates(
+        self,
+        session: AsyncSession,
+        book_uid,
+        added: Optional[int] = None,
+        removed: Optional[int] = None,
+    ):
+        """
+        Count the rating of a review in (`added`) and out (`removed`) of the
+        rating aggregates of its book and bump the book version. Runs in the
+        caller's transaction, so the aggregates commit or roll back with the
+        review.
+        """
+        values = {
+            "review_count": Book.review_count
+            + (added is not None)
+            - (removed is not None),
+            "rating_sum": Book.rating_sum + (added or 0) - (removed or 0),
+            "version": Book.version + 1,
+        }
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is not None:
+                counter = f"rating_{rating}_count"
+                values[counter] = values.get(counter, getattr(Book, counter)) + delta
+        statement = (
+            update(Book)
+            .where(Book.uid == book_uid)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.exec(statement)
+
+    async def count_user_rating(
+        self, session: AsyncSession, book_uid, user_uid, rating: int
+    ) -> bool:
+        """
+        Count a user's rating of a book in its aggregates, taking out the
+        rating of the user's current review of the book if there is one. Must
+        run before that review is written, in the same transaction. The book
+        row is locked before the current review is read, so concurrent
+        reviews of one book are counted one at a time, each seeing the review
+        the one before it wrote. Returns False if the book does not exist.
+        """
+        if not await self.lock_book(session, book_uid):
+            return False
+        statement = select(Review.rating).where(
+            Review.book_uid == book_uid, Review.user_uid == user_uid
+        )
+        results = await session.exec(statement)
+        await self.adjust_rating_aggregates(
+            session, book_uid, added=rating, removed=results.first()
+        )
+        return True
+
+    async def repair_rating_aggregates(self, session: AsyncSession):
+        """
+        Recompute the rating aggregates of every book from its reviews and
+        rewrite the ones that drifted. Returns the number of books fixed.
+
+        Books are locked REPAIR_BATCH_SIZE at a time before their reviews
+        are counted, so a review written meanwhile either committed before
+        the count or updates the book after the repair, never in between.
+        """
+        aggregates = {
+            "review_count": func.count(Review.uid),
+            "rating_sum": func.coalesce(func.sum(Review.rating), 0),
+            **{
+                f"rating_{rating}_count": func.count(Review.uid).filter(
+                    Review.rating == rating
+                )
+                for rating in RATINGS
+            },
+        }
+        repaired = []
+        last_uid = None
+        while True:
+            locked = select(Book.uid).order_by(Book.uid).limit(REPAIR_BATCH_SIZE)
+            if last_uid is not None:
+                locked = locked.where(Book.uid > last_uid)
+            results = await session.exec(locked.with_for_update())
+            book_uids = results.all()
+            if not book_uids:
+                break
+            last_uid = book_uids[-1]
+
+            stats = (
+                select(
+                    Book.uid, *[value.label(name) for name, value in aggregates.items()]
+                )
+                .outerjoin(Review, Review.book_uid == Book.uid)
+                .where(Book.uid.in_(book_uids))
+                .group_by(Book.uid)
+                .subquery()
+            )
+            statement = (
+                update(Book)
+                .where(Book.uid == stats.c.uid)
+                .where(
+                    or_(*[getattr(Book, name) != stats.c[name] for name in aggregates])
+                )
+                .values(
+                    {
+                        **{name: stats.c[name] for name in aggregates},
+                        "version": Book.version + 1,
+                    }
+                )
+                .returning(Book.uid)
+                .execution_options(synchronize_session=False)
+            )
+            results = await session.exec(statement)
+            repaired += results.scalars().all()
+            await session.commit()
+        await book_detail_cache.invalidate(*[str(uid) for uid in repaired])
+        return len(repaired)
+
+    async def flush_views(self, session: AsyncSession):
+        """
+        Write the view counts buffered in redis to books.view_count, one
+        executemany per batch. Returns the number of views written.
+        """
+        books = Book.__table__
+        statement = (
+            update(books)
+            .where(books.c.uid == bindparam("b_uid"))
+            .values(view_count=books.c.view_count + bindparam("b_views"))
+        )
+        flushed = 0
+        async for views in drain_pending_views():
+            params = [{"b_uid": uid, "b_views": count} for uid, count in views.items()]
+            await session.exec(statement, params=params)
+            await session.commit()
+            flushed += sum(views.values())
+        return flushed
+
+    async def get_related_books(
+        self, book_uid: uuid.UUID, limit: int, session: AsyncSession
+    ):
+        """The precomputed related books of a book, best first"""
+        statement = (
+            select(Book, RelatedBook.score)
+            .join(RelatedBook, RelatedBook.related_uid == Book.uid)
+            .where(RelatedBook.book_uid == book_uid)
+            .order_by(desc(RelatedBook.score), desc(RelatedBook.related_uid))
+            .limit(limit)
+        )
+        results = await session.exec(statement)
+        return [{"book": book, "score": score} for book, score in results.all()]
+
+    async def _insert_related(self, rows: List[dict], session: AsyncSession):
+        # an update task or the rebuild running at the same time may have
+        # written the same pairs since this one deleted them, last one wins
+        statement = insert(RelatedBook)
+        statement = statement.on_conflict_do_update(
+            index_elements=[RelatedBook.book_uid, RelatedBook.related_uid],
+            set_={"score": statement.excluded.score},
+        )
+        for start in range(0, len(rows), RELATED_INSERT_BATCH_SIZE):
+            batch = rows[start : start + RELATED_INSERT_BATCH_SIZE]
+            await session.exec(statement, params=batch)
+
+    async def rebuild_related_books(self, session: AsyncSession):
+        """
+        Recompute the related books of every book from the whole book x tag
+        matrix and replace them in one transaction. Returns the number of
+        books with related books.
+        """
+        statement = select(BookTag.book_id, BookTag.tag_id).where(
+            BookTag.tag_id.in_(informative_tags())
+        )
+        results = await session.exec(statement)
+        matrix = TagMatrix(results.all())
+        rows = [
+            {"book_uid": book_uid, "related_uid": related_uid, "score": score}
+            for book_uid in matrix.book_uids
+            for related_uid, score in matrix.related(book_uid)
+        ]
+        await session.exec(delete(RelatedBook))
+        await self._insert_related(rows, session)
+        await session.commit()
+        return len({row["book_uid"] for row in rows})
+
+    async def update_related_books(
+        self, session: AsyncSession, book_uids: List[uuid.UUID]
+    ):
+        """
+        Rescore books whose tags changed. Their related lists are recomputed
+        and their entry in the list of every book sharing a tag with them is
+        rewritten, then those lists are trimmed back to RELATED_LIMIT. A list
+        an entry drops out of is only refilled by the next rebuild.
+        """
+        # the rows of the changed books and of every book sharing a tag with
+        # them, which is all it takes to score the pairs they are part of
+        neighbours = select(BookTag.book_id).where(
+            BookTag.tag_id.in_(informative_tags(book_uids))
+        )
+        statement = (
+            select(BookTag.book_id, BookTag.tag_id)
+            .where(BookTag.book_id.in_(neighbours))
+            .where(BookTag.tag_id.in_(informative_tags(neighbours)))
+        )
+        results = await session.exec(statement)
+        matrix = TagMatrix(results.all())
+
+        changed = set(book_uids)
+        rows, reverse_rows = [], {}
+        for book_uid in changed:
+            related = matrix.related(book_uid, limit=None)
+            rows += [
+                {"book_uid": book_uid, "related_uid": related_uid, "score": score}
+                for related_uid, score in related[:RELATED_LIMIT]
+            ]
+            for related_uid, score in related:
+                if related_uid not in changed:
+                    reverse_rows[related_uid, book_uid] = score
+        rows += [
+            {"book_uid": book_uid, "related_uid": related_uid, "score": score}
+            for (book_uid, related_uid), score in reverse_rows.items()
+        ]
+
+        await session.exec(
+            delete(RelatedBook).where(
+                or_(
+                    RelatedBook.book_uid.in_(changed),
+                    RelatedBook.related_uid.in_(changed),
+                )
+            )
+        )
+        await self._insert_related(rows, session)
+        trimmed = list({book_uid for book_uid, _ in reverse_rows})
+        if trimmed:
+            ranked = (
+                select(
+                    RelatedBook.book_uid,
+                    RelatedBook.related_uid,
+                    func.row_number()
+                    .over(
+                        partition_by=RelatedBook.book_uid,
+                        order_by=(
+                            desc(RelatedBook.score),
+                            desc(RelatedBook.related_uid),
+                        ),
+                    )
+                    .label("rank"),
+                )
+                .where(RelatedBook.book_uid.in_(trimmed))
+                .subquery()
+            )
+            await session.exec(
+                delete(RelatedBook).where(
+                    tuple_(RelatedBook.book_uid, RelatedBook.related_uid).in_(
+                        select(ranked.c.book_uid, ranked.c.related_uid).where(
+                            ranked.c.rank > RELATED_LIMIT
+                        )
+                    )
+                )
+            )
+        await session.commit()
+        return len(rows)
+
+    async def rebuild_similar_index(
+        self, session: AsyncSession, directory: str = Config.SIMILAR_INDEX_DIR
+    ):
+        """
+        Write a new generation of the similar books index (src/books/similar.py)
+        and make it current. Returns the number of books indexed.
+        """
+        results = await session.exec(select(func.count()).select_from(Book))
+        writer = IndexWriter(directory, results.one())
+        columns = (Book.uid, Book.title, Book.author, Book.publisher)
+        after = None
+        while writer.remaining:
+            statement = select(*columns).order_by(Book.uid)
+            if after is not None:
+                statement = statement.where(Book.uid > after)
+            results = await session.exec(
+                statement.limit(min(BUILD_BATCH_SIZE, writer.remaining))
+            )
+            rows = results.all()
+            if not rows:
+                # books deleted since they were counted
+                break
+            writer.add(rows)
+            after = rows[-1].uid
+        writer.commit()
+        return writer.written
+
     async def create_book(
         self, book_data: BookCreateModel, user_uid: str, session: AsyncSession
     ):
@@ -40,24 +651,120 @@ class BookService:
         await session.commit()
         return new_book
 
+    async def import_books(self, rows, user_uid: str, session: AsyncSession):
+        """Validate streamed rows and insert the valid ones chunk by chunk"""
+        report = {"inserted": 0, "failed": 0, "errors": []}
+        chunk = []
+        async for row_number, row in rows:
+            values, errors = validate_row(row)
+            if errors:
+                report_failure(report, row_number, errors)
+                continue
+            values["user_uid"] = user_uid
+            chunk.append((row_number, values))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                await self._insert_books(chunk, session, report)
+                chunk = []
+        if chunk:
+            await self._insert_books(chunk, session, report)
+        return report
+
+    async def _insert_books(self, chunk: List[tuple], session: AsyncSession, report):
+        """
+        Insert a chunk of (row number, values). Rows the database refuses
+        although they passed validation (a number out of the column's range,
+        a NUL character) are found by retrying the chunk row by row, each in
+        a savepoint, and reported like invalid rows.
+        """
+        try:
+            # one executemany, sent by the driver as batched multi-row INSERTs
+            async with session.begin_nested():
+                await session.exec(insert(Book), params=[values for _, values in chunk])
+            report["inserted"] += len(chunk)
+        except DBAPIError:
+            for row_number, values in chunk:
+                try:
+                    async with session.begin_nested():
+                        await session.exec(insert(Book), params=[values])
+                    report["inserted"] += 1
+                except DBAPIError as e:
+                    message = str(e.orig).strip().splitlines()[0]
+                    error = {
+                        "field": None,
+                        "message": f"rejected by the database: {message}",
+                    }
+                    report_failure(report, row_number, [error])
+        await session.commit()
+
     async def update_book(
-        self, book_uid: str, update_data: BookUpdateModel, session: AsyncSession
+        self,
+        book_uid: str,
+        update_data: BookUpdateModel,
+        session: AsyncSession,
+        expected_version: Optional[int] = None,
     ):
-        book_to_update = await self.get_book(book_uid, session)
-        if book_to_update is not None:
-            update_data_dict = update_data.model_dump()
-            for key, value in update_data_dict.items():
-                setattr(book_to_update, key, value)
-            await session.commit()
-            return book_to_update
-        else:
+        """
+        Apply the update with a single UPDATE ... RETURNING. When
+        `expected_version` is given the row is only written if nobody changed
+        it in the meantime, otherwise BookVersionMismatch is raised.
+        """
+        statement = update(Book).where(Book.uid == book_uid)
+        if expected_version is not None:
+            statement = statement.where(Book.version == expected_version)
+        statement = (
+            statement.values(**update_data.model_dump(), version=Book.version + 1)
+            .returning(*[getattr(Book, field) for field in BOOK_FIELDS])
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        updated_book = results.first()
+        await session.commit()
+
+        if updated_book is None:
+            if expected_version is not None:
+                # tell a stale version apart from a missing book
+                if await self.get_book_version(book_uid, session) is not None:
+                    raise BookVersionMismatch()
             return None
+        await book_detail_cache.invalidate(str(book_uid))
+        return project(updated_book, BOOK_FIELDS)
 
     async def delete_book(self, book_uid: str, session: AsyncSession):
-        book_to_delete = await self.get_book(book_uid, session)
-        if book_to_delete is not None:
-            await session.delete(book_to_delete)
-            await session.commit()
+        # reviews and tag links go with it through ON DELETE CASCADE
+        statement = (
+            delete(Book)
+            .where(Book.uid == book_uid)
+            .returning(Book.uid)
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        deleted = results.first()
+        await session.commit()
+        if deleted is not None:
+            await book_detail_cache.invalidate(str(book_uid))
             return {}
         else:
             return None
+
+    async def delete_books(self, book_uids: List[uuid.UUID], session: AsyncSession):
+        """Delete many books in one transaction, one statement per batch"""
+        book_uids = list(dict.fromkeys(book_uids))
+        deleted = []
+        for start in range(0, len(book_uids), BULK_DELETE_BATCH_SIZE):
+            batch = book_uids[start : start + BULK_DELETE_BATCH_SIZE]
+            statement = (
+                delete(Book)
+                .where(Book.uid.in_(batch))
+                .returning(Book.uid)
+                .execution_options(synchronize_session=False)
+            )
+            results = await session.exec(statement)
+            deleted.extend(results.scalars().all())
+        await session.commit()
+        await book_detail_cache.invalidate(*[str(uid) for uid in deleted])
+
+        deleted_uids = set(deleted)
+        return {
+            "deleted": [uid for uid in book_uids if uid in deleted_uids],
+            "missing": [uid for uid in book_uids if uid not in deleted_uids],
+        }
@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import time
+import uuid
+import zlib
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Books are vectors of hashed title, author and publisher features weighted
+# by TF-IDF. An index generation is three .npy files opened as memmaps:
+#   vectors-{generation}.npy  float32 (books, DIMENSIONS), L2 normalized
+#   uids-{generation}.npy     the 16 uid bytes of every row
+#   idf-{generation}.npy      float32 (DIMENSIONS,), to vectorize new books
+# and index.json names the current generation. It is replaced atomically
+# once a generation is complete, readers reopen the files when it changes.
+DIMENSIONS = 512
+BUILD_BATCH_SIZE = 10000
+# rows scored per matrix product, bounds the memory of a search
+SEARCH_BATCH_ROWS = 65536
+MANIFEST = "index.json"
+WORD = re.compile(r"\w+")
+
+
+def features(title: str, author: str, publisher: str) -> List[str]:
+    """Title words and their character trigrams, author words, the publisher"""
+    title_words = WORD.findall(title.lower())
+    grams = [
+        f"t3:{word[i : i + 3]}"
+        for word in (f"#{word}#" for word in title_words)
+        for i in range(len(word) - 2)
+    ]
+    return [
+        *(f"t:{word}" for word in title_words),
+        *grams,
+        *(f"a:{word}" for word in WORD.findall(author.lower())),
+        f"p:{publisher.strip().lower()}",
+    ]
+
+
+def term_counts(title: str, author: str, publisher: str) -> np.ndarray:
+    # crc32 rather than hash(), which is salted per process
+    buckets = [
+        zlib.crc32(feature.encode()) % DIMENSIONS
+        for feature in features(title, author, publisher)
+    ]
+    return np.bincount(buckets, minlength=DIMENSIONS).astype(np.float32)
+
+
+def normalize(vectors: np.ndarray) -> None:
+    """Scale rows to unit length in place, empty rows stay zero"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+
+def generation_path(directory: str, name: str, generation: str) -> str:
+    return os.path.join(directory, f"{name}-{generation}.npy")
+
+
+class IndexWriter:
+    """
+    Writes a new generation for up to `size` books, added in batches of
+    (uid, title, author, publisher) rows in uid order, which makes the uid
+    table searchable by bisection. Nothing is visible to readers until
+    `commit`.
+    """
+
+    def __init__(self, directory: str, size: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.generation = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.size = size
+        self.written = 0
+        self.vectors = np.lib.format.open_memmap(
+            self.path("vectors"), mode="w+", dtype=np.float32, shape=(size, DIMENSIONS)
+        )
+        self.uids = np.zeros(size, dtype="S16")
+        self.document_frequency = np.zeros(DIMENSIONS, dtype=np.int64)
+
+    def path(self, name: str) -> str:
+        return generation_path(self.directory, name, self.generation)
+
+    @property
+    def remaining(self) -> int:
+        return self.size - self.written
+
+    def add(self, rows: Sequence) -> None:
+        rows = rows[: self.remaining]
+        start, end = self.written, self.written + len(rows)
+        for offset, (uid, title, author, publisher) in enumerate(rows):
+            self.vectors[start + offset] = term_counts(title, author, publisher)
+            self.uids[start + offset] = uid.bytes
+        self.document_frequency += np.count_nonzero(self.vectors[start:end], axis=0)
+        self.written = end
+
+    def commit(self) -> None:
+        # smoothed idf, as if one more document held every feature
+        idf = np.log((1 + self.written) / (1 + self.document_frequency)) + 1
+        idf = idf.astype(np.float32)
+        for start in range(0, self.written, SEARCH_BATCH_ROWS):
+            batch = self.vectors[start : min(start + SEARCH_BATCH_ROWS, self.written)]
+            batch *= idf
+            normalize(batch)
+        self.vectors.flush()
+        np.save(self.path("uids"), self.uids[: self.written])
+        np.save(self.path("idf"), idf)
+
+        manifest = os.path.join(self.directory, MANIFEST)
+        pending = f"{manifest}.{self.generation}"
+        with open(pending, "w") as f:
+            json.dump({"generation": self.generation, "size": self.written}, f)
+        os.replace(pending, manifest)
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove all but this generation and the previous one, which
+        workers may still be searching until they notice the new manifest"""
+        generations = sorted(
+            {
+                name.split("-", 1)[1][: -len(".npy")]
+                for name in os.listdir(self.directory)
+                if name.startswith("vectors-")
+            }
+        )
+        for generation in generations[:-2]:
+            for name in ("vectors", "uids", "idf"):
+                try:
+                    os.remove(generation_path(self.directory, name, generation))
+                except FileNotFoundError:
+                    pass
+
+
+class SimilarIndex:
+    """A worker's read-only view of the current index generation"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest_id = None
+        self._current = None
+
+    def current(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """The (vectors, uids, idf) memmaps, reopened when the manifest changed"""
+        manifest = os.path.join(self.directory, MANIFEST)
+        try:
+            stat = os.stat(manifest)
+        except FileNotFoundError:
+            return None
+        # os.replace gives every manifest a new inode
+        manifest_id = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if manifest_id != self._manifest_id:
+                with open(manifest) as f:
+                    generation = json.load(f)
+                vectors, uids, idf = (
+                    np.load(
+                        generation_path(self.directory, name, generation["generation"]),
+                        mmap_mode="r",
+                    )
+                    for name in ("vectors", "uids", "idf")
+                )
+                # searches holding the previous arrays keep their mappings
+                size = generation["size"]
+                self._current = (vectors[:size], uids, idf)
+                self._manifest_id = manifest_id
+            return self._current
+
+    def similar(self, book, limit: int) -> List[Tuple[uuid.UUID, float]]:
+        """
+        The `limit` books of the index with the highest cosine similarity to
+        `book`, best first. Books added since the last build are vectorized
+        with the idf of the index.
+        """
+        index = self.current()
+        if index is None:
+            return []
+        vectors, uids, idf = index
+        # "S16" values drop their trailing NUL bytes, and so must the key
+        key = np.bytes_(book.uid.bytes.rstrip(b"\0"))
+        row = int(np.searchsorted(uids, key))
+        if row == len(uids) or uids[row] != key:
+            row = None
+        if row is not None:
+            query = np.array(vectors[row])
+        else:
+            query = term_counts(book.title, book.author, book.publisher) * idf
+            normalize(query)
+
+        # the query book is dropped from its own results
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(vectors), SEARCH_BATCH_ROWS):
+            scores = vectors[start : start + SEARCH_BATCH_ROWS] @ query
+            rows = np.arange(start, start + len(scores))
+            if row is not None and start <= row < start + len(scores):
+                scores[row - start] = -1
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > limit:
+                top = np.argpartition(-best_scores, limit - 1)[:limit]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+        order = np.argsort(-best_scores, kind="stable")
+        return [
+            (uuid.UUID(bytes=bytes(uids[r]).ljust(16, b"\0")), float(score))
+            for r, score in zip(best_rows[order], best_scores[order])
+            if score > 0
+        ]
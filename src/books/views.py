@@ -0,0 +1,134 @@
+import time
+import uuid
+import logging
+from typing import List, Optional, Tuple
+from redis.exceptions import LockError, RedisError, ResponseError
+
+from src.db.redis import cache_client
+
+# Views are counted in redis only and written behind to postgres:
+#   views:{bucket}                 zset book uid -> views in that hour
+#   views:visitors:{bucket}:{uid}  hyperloglog of the viewers of a book
+#   views:pending                  zset book uid -> views not yet in postgres
+VIEW_BUCKET_SECONDS = 3600
+TRENDING_WINDOWS = {"hour": 1, "day": 24, "week": 168}
+# a bucket counts half as much every quarter of the window
+TRENDING_HALF_LIVES = 4
+TRENDING_CACHE_SECONDS = 60
+VIEW_RETENTION_SECONDS = (TRENDING_WINDOWS["week"] + 1) * VIEW_BUCKET_SECONDS
+FLUSH_BATCH_SIZE = 1000
+# held by the flush draining views:flushing and renewed every batch, so a
+# flush running past the beat interval is not joined by the next one
+FLUSH_LOCK_SECONDS = 300
+
+PENDING_KEY = "views:pending"
+FLUSHING_KEY = "views:flushing"
+FLUSH_LOCK_KEY = "views:flush:lock"
+
+
+def current_bucket(now: Optional[float] = None) -> int:
+    return int((now if now is not None else time.time()) // VIEW_BUCKET_SECONDS)
+
+
+def bucket_key(bucket: int) -> str:
+    return f"views:{bucket}"
+
+
+def visitors_key(bucket: int, book_uid) -> str:
+    return f"views:visitors:{bucket}:{book_uid}"
+
+
+def window_weights(window: str, now: Optional[float] = None) -> dict:
+    """Decay weight of every hourly bucket in the window, by bucket number"""
+    buckets = TRENDING_WINDOWS[window]
+    half_life = buckets / TRENDING_HALF_LIVES
+    newest = current_bucket(now)
+    return {newest - age: 0.5 ** (age / half_life) for age in range(buckets)}
+
+
+async def record_view(book_uid, viewer_uid: str) -> None:
+    """Count a view, meant to run as a background task after the response"""
+    bucket = current_bucket()
+    try:
+        async with cache_client.pipeline(transaction=False) as pipe:
+            pipe.zincrby(bucket_key(bucket), 1, str(book_uid))
+            pipe.expire(bucket_key(bucket), VIEW_RETENTION_SECONDS)
+            pipe.pfadd(visitors_key(bucket, book_uid), viewer_uid)
+            pipe.expire(visitors_key(bucket, book_uid), VIEW_RETENTION_SECONDS)
+            pipe.zincrby(PENDING_KEY, 1, str(book_uid))
+            await pipe.execute()
+    except RedisError as e:
+        logging.warning("book views: recording failed: %s", e)
+
+
+async def trending(window: str, limit: int) -> List[Tuple[uuid.UUID, float, int]]:
+    """
+    The most viewed books of the window as (uid, decayed views, unique
+    viewers). The decayed ranking is merged from the hourly buckets at most
+    once every TRENDING_CACHE_SECONDS. Nothing is trending while redis is
+    unreachable.
+    """
+    try:
+        return await _trending(window, limit)
+    except RedisError as e:
+        logging.warning("book views: trending failed: %s", e)
+        return []
+
+
+async def _trending(window: str, limit: int) -> List[Tuple[uuid.UUID, float, int]]:
+    weights = window_weights(window)
+    ranking_key = f"views:trending:{window}:{max(weights)}"
+    if not await cache_client.exists(ranking_key):
+        async with cache_client.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(
+                ranking_key,
+                {bucket_key(bucket): weight for bucket, weight in weights.items()},
+            )
+            pipe.expire(ranking_key, TRENDING_CACHE_SECONDS)
+            await pipe.execute()
+    ranking = await cache_client.zrevrange(ranking_key, 0, limit - 1, withscores=True)
+
+    async with cache_client.pipeline(transaction=False) as pipe:
+        for member, _ in ranking:
+            pipe.pfcount(*[visitors_key(bucket, member.decode()) for bucket in weights])
+        visitors = await pipe.execute()
+    return [
+        (uuid.UUID(member.decode()), score, unique_viewers)
+        for (member, score), unique_viewers in zip(ranking, visitors)
+    ]
+
+
+async def drain_pending_views():
+    """
+    Yields batches of {book uid: views} recorded since the last flush. A
+    batch is removed from redis once the consumer asks for the next one, so
+    a flush that dies halfway resumes where it stopped and at most one batch
+    is counted twice. Yields nothing while another flush holds the lock.
+    """
+    lock = cache_client.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_SECONDS)
+    if not await lock.acquire(blocking=False):
+        return
+    try:
+        # new views go to a fresh pending key while this one is drained
+        if not await cache_client.exists(FLUSHING_KEY):
+            try:
+                await cache_client.rename(PENDING_KEY, FLUSHING_KEY)
+            except ResponseError:
+                # no views since the last flush
+                return
+        while True:
+            batch = await cache_client.zrange(
+                FLUSHING_KEY, 0, FLUSH_BATCH_SIZE - 1, withscores=True
+            )
+            if not batch:
+                break
+            # raises LockError if the lock expired, another flush may have
+            # counted the batch already
+            await lock.reacquire()
+            yield {uuid.UUID(member.decode()): int(views) for member, views in batch}
+            await cache_client.zrem(FLUSHING_KEY, *[member for member, _ in batch])
+    finally:
+        try:
+            await lock.release()
+        except LockError:
+            pass
@@ -1,10 +1,41 @@
+import uuid
 from celery import Celery
+from celery.schedules import crontab
 from asgiref.sync import async_to_sync
 
 from src.mail import mail, create_message
+from src.books.service import BookService
+from src.reviews.service import ReviewService
+from src.db.main import task_session
+from src.db.redis import cache_client
 
 c_app = Celery()
 c_app.config_from_object("src.config")
+c_app.conf.beat_schedule = {
+    "repair-rating-aggregates": {
+        "task": "src.celery_tasks.repair_rating_aggregates",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "flush-book-views": {
+        "task": "src.celery_tasks.flush_book_views",
+        "schedule": 60.0,
+    },
+    "rebuild-related-books": {
+        "task": "src.celery_tasks.rebuild_related_books",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "rebuild-similar-index": {
+        "task": "src.celery_tasks.rebuild_similar_index",
+        "schedule": crontab(hour=4, minute=30),
+    },
+    "rebuild-recommendations": {
+        "task": "src.celery_tasks.rebuild_recommendations",
+        "schedule": crontab(hour=5, minute=0),
+    },
+}
+
+book_service = BookService()
+review_service = ReviewService()
 
 
 @c_app.task()
@@ -12,3 +43,57 @@ def send_email(recipients: list[str], subject: str, body: str):
     message = create_message(recipients=recipients, subject=subject, body=body)
     async_to_sync(mail.send_message)(message)
     print("Email sent")
+
+
+def run_with_session(task, *args):
+    """Run `task(session, *args)` to completion from a worker"""
+
+    async def run():
+        try:
+            async with task_session() as session:
+                return await task(session, *args)
+        finally:
+            # redis connections are bound to this call's event loop as well
+            await cache_client.connection_pool.disconnect()
+
+    return async_to_sync(run)()
+
+
+@c_app.task()
+def repair_rating_aggregates():
+    repaired = run_with_session(book_service.repair_rating_aggregates)
+    print(f"Repaired rating aggregates of {repaired} books")
+
+
+@c_app.task()
+def flush_book_views():
+    flushed = run_with_session(book_service.flush_views)
+    print(f"Flushed {flushed} book views")
+
+
+@c_app.task()
+def rebuild_related_books():
+    books = run_with_session(book_service.rebuild_related_books)
+    print(f"Rebuilt the related books of {books} books")
+
+
+@c_app.task()
+def update_related_books(book_uids: list[str]):
+    """Rescore books after their tags changed, queued by TagService"""
+    rows = run_with_session(
+        book_service.update_related_books, [uuid.UUID(uid) for uid in book_uids]
+    )
+    print(f"Rewrote {rows} related books of {len(book_uids)} books")
+
+
+@c_app.task()
+def rebuild_similar_index():
+    # web workers switch to the new generation on their next search
+    books = run_with_session(book_service.rebuild_similar_index)
+    print(f"Indexed {books} books for similar search")
+
+
+@c_app.task()
+def rebuild_recommendations():
+    users = run_with_session(review_service.rebuild_recommendations)
+    print(f"Rebuilt the recommendations of {users} users")
@@ -11,6 +11,16 @@ class Settings(BaseSettings):
 
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    BOOK_CACHE_SIZE: int = 1024
+    BOOK_CACHE_TTL: int = 30
+    BOOK_CACHE_REDIS_TTL: int = 300
+
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300
+
+    SIMILAR_INDEX_DIR: str = "var/similar_index"
+
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: EmailStr
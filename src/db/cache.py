@@ -0,0 +1,210 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from redis.exceptions import RedisError
+
+from src.db.redis import cache_client
+
+SUBSCRIBE_RETRY_DELAY = 5
+# invalidation counters must outlive any fill still running when they are
+# bumped, or the fill could see the same count again after they expire
+GENERATION_TTL = 86400
+
+# stores the value only if the key was not invalidated since the fill began
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[3] then
+    return redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return false
+"""
+
+
+class LRUCache:
+    """Bounded in-process cache, least recently used entries go first"""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TwoTierCache:
+    """
+    Read-through cache of serialized values: a per-worker LRU in front of
+    Redis. Invalidations are published on a Redis channel so every worker
+    drops its local copy, not just the one that handled the write.
+
+    A value loaded on a miss is only stored if no invalidation happened
+    since the `generation` taken before loading it. Otherwise a write
+    committed between the load and the `set` would be cached as stale data
+    until the TTL expires.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, redis_ttl: int) -> None:
+        self.name = name
+        self.local = LRUCache(maxsize, ttl)
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.channel = f"cache:{name}:invalidate"
+        # local entries dropped so far, any of them may be the key being filled
+        self.local_invalidations = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    def _key(self, key: str) -> str:
+        return f"cache:{self.name}:{key}"
+
+    def _generation_key(self, key: str) -> str:
+        return f"cache:{self.name}:generation:{key}"
+
+    def _drop_local(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.delete(key)
+        self.local_invalidations += 1
+
+    async def get(self, key: str) -> Optional[str]:
+        self._listen()
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        try:
+            value = await cache_client.get(self._key(key))
+        except RedisError as e:
+            logging.warning("cache %s: redis read failed: %s", self.name, e)
+            return None
+        if value is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        value = value.decode()
+        self.local.set(key, value)
+        return value
+
+    async def generation(self, key: str) -> Tuple[int, Optional[int]]:
+        """Taken on a miss before loading the value, and passed to `set`"""
+        local = self.local_invalidations
+        try:
+            shared = int(await cache_client.get(self._generation_key(key)) or 0)
+        except RedisError as e:
+            logging.warning("cache %s: redis read failed: %s", self.name, e)
+            shared = None
+        return local, shared
+
+    async def set(
+        self, key: str, value: str, generation: Optional[Tuple] = None
+    ) -> None:
+        """
+        Store a value. Given the `generation` taken before the value was
+        loaded, only where the key was not invalidated since.
+        """
+        if generation is None:
+            self.local.set(key, value)
+            try:
+                await cache_client.set(self._key(key), value, ex=self.redis_ttl)
+            except RedisError as e:
+                logging.warning("cache %s: redis write failed: %s", self.name, e)
+            return
+        local, shared = generation
+        if local == self.local_invalidations:
+            self.local.set(key, value)
+        if shared is None:
+            # redis was unreachable, the invalidations are unknown
+            return
+        try:
+            await cache_client.eval(
+                SET_IF_GENERATION,
+                2,
+                self._key(key),
+                self._generation_key(key),
+                value,
+                self.redis_ttl,
+                shared,
+            )
+        except RedisError as e:
+            logging.warning("cache %s: redis write failed: %s", self.name, e)
+
+    async def invalidate(self, *keys: str) -> None:
+        for key in keys:
+            self._drop_local(key)
+        if not keys:
+            return
+        try:
+            # the generation goes first, fills that read the old value from
+            # the database after that will not store it
+            async with cache_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(self._generation_key(key))
+                    pipe.expire(self._generation_key(key), GENERATION_TTL)
+                pipe.delete(*[self._key(key) for key in keys])
+                for key in keys:
+                    pipe.publish(self.channel, key)
+                await pipe.execute()
+        except RedisError as e:
+            logging.warning("cache %s: redis invalidation failed: %s", self.name, e)
+
+    def stats(self) -> dict:
+        return {
+            "local": self.local.stats(),
+            "redis": {"hits": self.redis_hits, "misses": self.redis_misses},
+        }
+
+    def _listen(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._listener is None
+            or self._listener.done()
+            or self._listener.get_loop() is not loop
+        ):
+            self._listener = loop.create_task(self._subscribe())
+
+    async def _subscribe(self) -> None:
+        while True:
+            try:
+                async with cache_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._drop_local(message["data"].decode())
+            except RedisError as e:
+                logging.warning("cache %s: subscription lost: %s", self.name, e)
+            # invalidations may have been missed while disconnected
+            self._drop_local()
+            await asyncio.sleep(SUBSCRIBE_RETRY_DELAY)
@@ -0,0 +1,39 @@
+import io
+import csv
+import json
+from typing import AsyncIterator
+
+from src.db.main import async_session
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def stream_export(statement, export_format: str) -> AsyncIterator[str]:
+    """
+    Stream the rows of a column select as NDJSON or CSV.
+
+    Rows are read through a server-side cursor `EXPORT_BATCH_SIZE` at a time
+    and each batch is written out before the next one is fetched, so memory
+    stays flat however large the table is. The generator owns its session
+    because it keeps running after the request handler has returned.
+    """
+    async with async_session() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        keys = list(result.keys())
+        if export_format == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(keys)
+            yield buffer.getvalue()
+
+        async for rows in result.partitions():
+            buffer = io.StringIO()
+            if export_format == "csv":
+                csv.writer(buffer).writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(keys, row)), default=str))
+                    buffer.write("\n")
+            yield buffer.getvalue()
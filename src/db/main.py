@@ -2,11 +2,20 @@ from sqlmodel import SQLModel, create_engine
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from src.config import Config
 
 
 engine = AsyncEngine(create_engine(url=Config.DATABASE_URL))
+async_session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+# celery tasks run every call on a fresh event loop (async_to_sync), pooled
+# asyncpg connections are bound to the loop that opened them
+task_engine = AsyncEngine(create_engine(url=Config.DATABASE_URL, poolclass=NullPool))
+task_session = sessionmaker(
+    bind=task_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 
 async def init_db():
@@ -17,6 +26,5 @@ async def init_db():
 
 
 async def get_session() -> AsyncSession:
-    Session = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
-    async with Session() as session:
+    async with async_session() as session:
         yield session
@@ -1,9 +1,14 @@
 import uuid
 from datetime import datetime, date
 from typing import List, Optional
-from sqlmodel import SQLModel, Field, Column, Relationship
+from sqlalchemy import Computed, func
+from sqlmodel import SQLModel, Field, Column, Relationship, Index, UniqueConstraint
 import sqlalchemy.dialects.postgresql as pg
 
+# Relationships never load implicitly. Every query states the relations it
+# needs with loader options (selectinload & co.), and touching one that was
+# not loaded raises instead of silently issuing more queries.
+
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
@@ -25,10 +30,10 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
     books: List["Book"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
     reviews: List["Review"] = Relationship(
-        back_populates="user", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="user", sa_relationship_kwargs={"lazy": "raise"}
     )
 
     def __repr__(self) -> str:
@@ -36,29 +41,120 @@ class User(SQLModel, table=True):
 
 
 class BookTag(SQLModel, table=True):
-    book_id: uuid.UUID = Field(default=None, foreign_key="books.uid", primary_key=True)
+    # the primary key serves book -> tags, this one tag -> books
+    __table_args__ = (Index("ix_booktag_tag_id_book_id", "tag_id", "book_id"),)
+
+    book_id: uuid.UUID = Field(
+        default=None, foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
     tag_id: uuid.UUID = Field(default=None, foreign_key="tags.uid", primary_key=True)
 
 
 class Tag(SQLModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (Index("ix_tags_created_at_uid", "created_at", "uid"),)
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
-    name: str = Field(sa_column=Column(pg.VARCHAR, nullable=False))
+    name: str = Field(
+        sa_column=Column(pg.VARCHAR, nullable=False, unique=True, index=True)
+    )
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
+    version: int = Field(
+        default=1, sa_column=Column(pg.INTEGER, nullable=False, server_default="1")
+    )
     books: List["Book"] = Relationship(
         link_model=BookTag,
         back_populates="tags",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise"},
     )
 
     def __repr__(self) -> str:
         return f"<Tag {self.name}>"
 
 
+# case-insensitive prefix lookups (autocomplete): in the "C" collation
+# `lower(name) COLLATE "C" LIKE 'abc%'` is a range of the index, which also
+# returns the matches in order, whatever the database collation
+Index(
+    "ix_tags_lower_name_pattern",
+    func.lower(Tag.name).collate("C"),
+)
+
+
+BOOK_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(publisher, '')), 'C')"
+)
+
+# reviews are rated 0-4, books keep a per-rating count next to the totals
+RATINGS = range(5)
+BOOK_AVERAGE_RATING = (
+    "CASE WHEN review_count > 0 THEN rating_sum * 1.0 / review_count ELSE 0 END"
+)
+
+
+def counter_column(**kwargs):
+    return Column(pg.INTEGER, nullable=False, server_default="0", **kwargs)
+
+
 class Book(SQLModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        # generated by postgres and only used for filtering, so it lives on
+        # the table but is never loaded into Book instances
+        Column(
+            "search_vector", pg.TSVECTOR, Computed(BOOK_SEARCH_VECTOR, persisted=True)
+        ),
+        Index("ix_books_created_at_uid", "created_at", "uid"),
+        Index("ix_books_user_uid_created_at_uid", "user_uid", "created_at", "uid"),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_books_average_rating_uid", "average_rating", "uid"),
+        Index("ix_books_review_count_uid", "review_count", "uid"),
+        # catalog filters, the equality ones keep the default keyset order.
+        # Each index a filter uses also includes every column a facet count
+        # reads, so counting under any filter is an index-only scan that
+        # never touches the wide heap rows
+        Index("ix_books_language_created_at_uid", "language", "created_at", "uid"),
+        Index(
+            "ix_books_publisher_created_at_uid",
+            "publisher",
+            "created_at",
+            "uid",
+            postgresql_include=["language", "published_date", "page_count"],
+        ),
+        Index(
+            "ix_books_published_date",
+            "published_date",
+            postgresql_include=["language", "publisher", "page_count", "uid"],
+        ),
+        Index(
+            "ix_books_page_count",
+            "page_count",
+            postgresql_include=["language", "publisher", "published_date", "uid"],
+        ),
+        # the books of a tag, looked up by uid
+        Index(
+            "ix_books_uid_facets",
+            "uid",
+            postgresql_include=[
+                "language",
+                "publisher",
+                "published_date",
+                "page_count",
+            ],
+        ),
+        # no filter or a language one
+        Index(
+            "ix_books_facets",
+            "language",
+            "publisher",
+            postgresql_include=["published_date", "page_count", "uid"],
+        ),
+    )
+    # eager_defaults reads average_rating back with RETURNING on every flush
+    __mapper_args__ = {"exclude_properties": ["search_vector"], "eager_defaults": True}
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
@@ -71,35 +167,135 @@ class Book(SQLModel, table=True):
     language: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    user: Optional[User] = Relationship(back_populates="books")
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
+    version: int = Field(
+        default=1, sa_column=Column(pg.INTEGER, nullable=False, server_default="1")
+    )
+    # rating aggregates, maintained by ReviewService in the transaction that
+    # adds or removes a review and recomputed by the repair task
+    review_count: int = Field(default=0, sa_column=counter_column())
+    rating_sum: int = Field(default=0, sa_column=counter_column())
+    rating_0_count: int = Field(default=0, sa_column=counter_column())
+    rating_1_count: int = Field(default=0, sa_column=counter_column())
+    rating_2_count: int = Field(default=0, sa_column=counter_column())
+    rating_3_count: int = Field(default=0, sa_column=counter_column())
+    rating_4_count: int = Field(default=0, sa_column=counter_column())
+    average_rating: float = Field(
+        default=None,
+        sa_column=Column(
+            pg.DOUBLE_PRECISION,
+            Computed(BOOK_AVERAGE_RATING, persisted=True),
+            nullable=False,
+        ),
+    )
+    # total views, written behind from the redis counters (src/books/views.py)
+    view_count: int = Field(
+        default=0, sa_column=Column(pg.BIGINT, nullable=False, server_default="0")
+    )
+    user: Optional[User] = Relationship(
+        back_populates="books", sa_relationship_kwargs={"lazy": "raise"}
+    )
+    # reviews and booktag rows are removed by ON DELETE CASCADE
     reviews: List["Review"] = Relationship(
-        back_populates="book", sa_relationship_kwargs={"lazy": "selectin"}
+        back_populates="book",
+        sa_relationship_kwargs={"lazy": "raise", "passive_deletes": True},
     )
     tags: List[Tag] = Relationship(
         link_model=BookTag,
         back_populates="books",
-        sa_relationship_kwargs={"lazy": "selectin"},
+        sa_relationship_kwargs={"lazy": "raise", "passive_deletes": True},
     )
 
+    @property
+    def rating_histogram(self) -> List[int]:
+        return [getattr(self, f"rating_{rating}_count") for rating in RATINGS]
+
     def __repr__(self):
         return f"<Book {self.title}>"
 
 
+Index("ix_books_lower_title_pattern", func.lower(Book.title).collate("C"))
+Index("ix_books_lower_author_pattern", func.lower(Book.author).collate("C"))
+
+
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # one review per user and book, writing it again updates it
+        UniqueConstraint("user_uid", "book_uid", name="uq_reviews_user_uid_book_uid"),
+        # keyset orders of the reviews of a book, newest and by rating
+        Index("ix_reviews_book_uid_created_at_uid", "book_uid", "created_at", "uid"),
+        Index(
+            "ix_reviews_book_uid_rating_created_at_uid",
+            "book_uid",
+            "rating",
+            "created_at",
+            "uid",
+        ),
+    )
 
     uid: uuid.UUID = Field(
         sa_column=Column(pg.UUID, nullable=False, primary_key=True, default=uuid.uuid4)
     )
-    rating: int = Field(lt=5)
+    rating: int = Field(ge=0, lt=5)
     review_text: str
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="users.uid")
-    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="books.uid")
+    book_uid: Optional[uuid.UUID] = Field(
+        default=None, foreign_key="books.uid", ondelete="CASCADE"
+    )
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))
-    user: Optional[User] = Relationship(back_populates="reviews")
-    book: Optional[Book] = Relationship(back_populates="reviews")
+    updated_at: datetime = Field(
+        sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now)
+    )
+    version: int = Field(
+        default=1, sa_column=Column(pg.INTEGER, nullable=False, server_default="1")
+    )
+    user: Optional[User] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
+    book: Optional[Book] = Relationship(
+        back_populates="reviews", sa_relationship_kwargs={"lazy": "raise"}
+    )
 
     def __repr__(self):
         return f"<Review for {self.book_uid} by user {self.user_uid}>"
+
+
+class RelatedBook(SQLModel, table=True):
+    """The tag similarity of two books, precomputed (src/books/related.py)"""
+
+    __tablename__ = "related_books"
+    # a book's related list, best first, is a range of this index
+    __table_args__ = (
+        Index("ix_related_books_book_uid_score", "book_uid", "score", "related_uid"),
+    )
+
+    book_uid: uuid.UUID = Field(
+        foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
+    related_uid: uuid.UUID = Field(
+        foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
+    score: float
+
+
+class UserRecommendation(SQLModel, table=True):
+    """A book recommended to a user, precomputed (src/reviews/recommendations.py)"""
+
+    __tablename__ = "user_recommendations"
+    # a user's recommendations, best first, are a range of this index
+    __table_args__ = (
+        Index(
+            "ix_user_recommendations_user_uid_score", "user_uid", "score", "book_uid"
+        ),
+    )
+
+    user_uid: uuid.UUID = Field(
+        foreign_key="users.uid", primary_key=True, ondelete="CASCADE"
+    )
+    book_uid: uuid.UUID = Field(
+        foreign_key="books.uid", primary_key=True, ondelete="CASCADE"
+    )
+    score: float
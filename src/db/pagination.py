@@ -0,0 +1,37 @@
+import json
+import base64
+import binascii
+from typing import Any, Callable, List, Optional
+
+from src.errors import InvalidCursor
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row of a page into an opaque token"""
+    payload = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: Optional[str], *parsers: Callable[[str], Any]
+) -> Optional[List[Any]]:
+    """Unpack a token made by `encode_cursor`, converting each value with its parser"""
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        # encode_cursor only writes strings, the parsers may fail on anything
+        # else with other errors, e.g. uuid.UUID(1) raises AttributeError
+        if (
+            not isinstance(values, list)
+            or len(values) != len(parsers)
+            or not all(isinstance(value, str) for value in values)
+        ):
+            raise InvalidCursor()
+        return [parse(value) for parse, value in zip(parsers, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursor()
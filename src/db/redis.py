@@ -4,6 +4,7 @@ from src.config import Config
 JTI_EXPIRY = 3600
 
 token_blocklist = Redis.from_url(url=Config.REDIS_URL)
+cache_client = Redis.from_url(url=Config.REDIS_URL)
 
 
 async def add_jti_to_blocklist(jti: str) -> None:
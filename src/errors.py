@@ -59,6 +59,12 @@ class BookNotFound(BooklyException):
     pass
 
 
+class BookVersionMismatch(BooklyException):
+    """Book was modified since the version the user based the change on"""
+
+    pass
+
+
 class TagNotFound(BooklyException):
     """Tag Not found"""
 
@@ -77,6 +83,24 @@ class UserNotFound(BooklyException):
     pass
 
 
+class InvalidCursor(BooklyException):
+    """User has provided a pagination cursor that cannot be decoded"""
+
+    pass
+
+
+class InvalidFieldSelection(BooklyException):
+    """User has requested fields that do not exist on the resource"""
+
+    pass
+
+
+class UnsupportedImportFormat(BooklyException):
+    """User has uploaded a body that is neither CSV nor NDJSON"""
+
+    pass
+
+
 class AccountNotVerified(Exception):
     """Account not yet verified"""
 
@@ -124,6 +148,17 @@ def register_all_errors(app: FastAPI):
             },
         ),
     )
+    app.add_exception_handler(
+        BookVersionMismatch,
+        create_exception_handler(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            initial_detail={
+                "message": "Book has been modified by someone else",
+                "resolution": "Fetch the book again and reapply your changes",
+                "error_code": "book_version_mismatch",
+            },
+        ),
+    )
     app.add_exception_handler(
         InvalidCredentials,
         create_exception_handler(
@@ -230,6 +265,42 @@ def register_all_errors(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        InvalidCursor,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "resolution": "Use the next_cursor returned by the previous page",
+                "error_code": "invalid_cursor",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        InvalidFieldSelection,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid field selection",
+                "resolution": "Only request fields that exist on the book",
+                "error_code": "invalid_fields",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        UnsupportedImportFormat,
+        create_exception_handler(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            initial_detail={
+                "message": "Unsupported import format",
+                "resolution": "Send text/csv or application/x-ndjson",
+                "error_code": "unsupported_import_format",
+            },
+        ),
+    )
+
     @app.exception_handler(500)
     async def internal_server_error(request, exc):
         return JSONResponse(
@@ -0,0 +1,120 @@
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationType,
+    ValidationRule,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+)
+
+from src.db.pagination import MAX_PAGE_SIZE
+
+MAX_QUERY_DEPTH = 6
+MAX_QUERY_COST = 5000
+# most rows of a relation list (a book's reviews, a tag's books), the loaders
+# return the first ones
+RELATION_LIST_SIZE = 20
+
+
+def list_size(field: FieldNode, field_def) -> int:
+    """Rows a list field is expected to return, from its `limit` argument"""
+    for argument in field.arguments or ():
+        if argument.name.value == "limit":
+            if isinstance(argument.value, IntValueNode):
+                return max(0, min(int(argument.value.value), MAX_PAGE_SIZE))
+            # a variable, not known until execution
+            return MAX_PAGE_SIZE
+    limit = field_def.args.get("limit")
+    if limit is not None:
+        return limit.default_value
+    return RELATION_LIST_SIZE
+
+
+class QueryLimitsRule(ValidationRule):
+    """
+    Rejects queries nested deeper than MAX_QUERY_DEPTH, or whose estimated
+    cost, the number of objects they could resolve, exceeds MAX_QUERY_COST.
+    Every list multiplies the cost of what is selected below it.
+    """
+
+    def enter_operation_definition(self, node, *_args):
+        if node.operation != OperationType.QUERY:
+            return
+        self.fragments = {
+            definition.name.value: definition
+            for definition in self.context.document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        depth, cost = self.measure(node.selection_set, self.context.schema.query_type)
+        if depth > MAX_QUERY_DEPTH:
+            self.report_error(
+                GraphQLError(
+                    f"Query depth {depth} exceeds the limit of {MAX_QUERY_DEPTH}.",
+                    node,
+                )
+            )
+        if cost > MAX_QUERY_COST:
+            self.report_error(
+                GraphQLError(
+                    f"Query cost {cost} exceeds the limit of {MAX_QUERY_COST}.",
+                    node,
+                )
+            )
+
+    def measure(self, selection_set, parent_type, multiplier=1, visited=()):
+        """Returns the (depth, cost) of a selection set on `parent_type`"""
+        depth, cost = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # unknown and cyclic spreads are reported by the standard rules
+                if fragment is None or name in visited:
+                    continue
+                fragment_type = self.context.schema.get_type(
+                    fragment.type_condition.name.value
+                )
+                sub_depth, sub_cost = self.measure(
+                    fragment.selection_set,
+                    fragment_type or parent_type,
+                    multiplier,
+                    (*visited, name),
+                )
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.context.schema.get_type(
+                        selection.type_condition.name.value
+                    )
+                sub_depth, sub_cost = self.measure(
+                    selection.selection_set, fragment_type, multiplier, visited
+                )
+            else:
+                sub_depth, sub_cost = self.measure_field(
+                    selection, parent_type, multiplier, visited
+                )
+            depth = max(depth, sub_depth)
+            cost += sub_cost
+        return depth, cost
+
+    def measure_field(self, field: FieldNode, parent_type, multiplier, visited):
+        name = field.name.value
+        fields = getattr(parent_type, "fields", {})
+        # introspection and unknown fields are not data, or are reported
+        # by the standard rules
+        if name.startswith("__") or name not in fields:
+            return 0, 0
+        if field.selection_set is None:
+            return 1, 0
+        field_type = get_nullable_type(fields[name].type)
+        if is_list_type(field_type):
+            multiplier *= list_size(field, fields[name])
+        depth, cost = self.measure(
+            field.selection_set, get_named_type(field_type), multiplier, visited
+        )
+        return depth + 1, cost + multiplier
@@ -0,0 +1,176 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List
+from sqlalchemy import func
+from sqlmodel import select, desc
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.db.models import Book, BookTag, Review, Tag, User
+from .limits import RELATION_LIST_SIZE
+
+
+class DataLoader:
+    """
+    Collects the keys asked for while the resolvers of one nesting level run
+    and loads them with a single `batch_load(keys)` call on the next loop
+    iteration. Results are cached for the lifetime of the loader.
+    """
+
+    def __init__(self, batch_load: Callable[[List[Any]], Awaitable[Dict]]) -> None:
+        self.batch_load = batch_load
+        self._futures: Dict[Any, asyncio.Future] = {}
+        self._queue: List[Any] = []
+
+    def load(self, key) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._futures[key] = loop.create_future()
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            loop.call_soon(lambda: loop.create_task(self._dispatch()))
+        return future
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        try:
+            values = await self.batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                self._futures.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._futures[key].set_result(values.get(key))
+
+
+class Loaders:
+    """The batch loaders of one GraphQL request, sharing its session"""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        # loaders of one level dispatch together but a session runs one
+        # statement at a time
+        self._lock = asyncio.Lock()
+
+        self.user = DataLoader(self._users)
+        self.book = DataLoader(self._books)
+        self.books_by_user = DataLoader(self._books_by_user)
+        self.books_by_tag = DataLoader(self._books_by_tag)
+        self.reviews_by_book = DataLoader(self._reviews_by_book)
+        self.reviews_by_user = DataLoader(self._reviews_by_user)
+        self.tags_by_book = DataLoader(self._tags_by_book)
+
+    async def all(self, statement) -> list:
+        async with self._lock:
+            results = await self.session.exec(statement)
+            return results.all()
+
+    async def _users(self, uids):
+        users = await self.all(select(User).where(User.uid.in_(uids)))
+        return {user.uid: user for user in users}
+
+    async def _books(self, uids):
+        books = await self.all(select(Book).where(Book.uid.in_(uids)))
+        return {book.uid: book for book in books}
+
+    async def _books_by_user(self, user_uids):
+        order = (desc(Book.created_at), desc(Book.uid))
+        ranked = (
+            select(Book.uid, position(Book.user_uid, *order))
+            .where(Book.user_uid.in_(user_uids))
+            .subquery()
+        )
+        statement = (
+            select(Book)
+            .join(ranked, ranked.c.uid == Book.uid)
+            .where(ranked.c.position <= RELATION_LIST_SIZE)
+            .order_by(*order)
+        )
+        return group(await self.all(statement), lambda book: book.user_uid)
+
+    async def _books_by_tag(self, tag_uids):
+        order = (desc(Book.created_at), desc(Book.uid))
+        ranked = (
+            select(BookTag.tag_id, BookTag.book_id, position(BookTag.tag_id, *order))
+            .join(Book, Book.uid == BookTag.book_id)
+            .where(BookTag.tag_id.in_(tag_uids))
+            .subquery()
+        )
+        statement = (
+            select(ranked.c.tag_id, Book)
+            .join(Book, Book.uid == ranked.c.book_id)
+            .where(ranked.c.position <= RELATION_LIST_SIZE)
+            .order_by(*order)
+        )
+        return group_pairs(await self.all(statement))
+
+    async def _reviews_by_book(self, book_uids):
+        order = (desc(Review.created_at), desc(Review.uid))
+        ranked = (
+            select(Review.uid, position(Review.book_uid, *order))
+            .where(Review.book_uid.in_(book_uids))
+            .subquery()
+        )
+        statement = (
+            select(Review)
+            .join(ranked, ranked.c.uid == Review.uid)
+            .where(ranked.c.position <= RELATION_LIST_SIZE)
+            .order_by(*order)
+        )
+        return group(await self.all(statement), lambda review: review.book_uid)
+
+    async def _reviews_by_user(self, user_uids):
+        order = (desc(Review.created_at), desc(Review.uid))
+        ranked = (
+            select(Review.uid, position(Review.user_uid, *order))
+            .where(Review.user_uid.in_(user_uids))
+            .subquery()
+        )
+        statement = (
+            select(Review)
+            .join(ranked, ranked.c.uid == Review.uid)
+            .where(ranked.c.position <= RELATION_LIST_SIZE)
+            .order_by(*order)
+        )
+        return group(await self.all(statement), lambda review: review.user_uid)
+
+    async def _tags_by_book(self, book_uids):
+        ranked = (
+            select(BookTag.book_id, BookTag.tag_id, position(BookTag.book_id, Tag.name))
+            .join(Tag, Tag.uid == BookTag.tag_id)
+            .where(BookTag.book_id.in_(book_uids))
+            .subquery()
+        )
+        statement = (
+            select(ranked.c.book_id, Tag)
+            .join(Tag, Tag.uid == ranked.c.tag_id)
+            .where(ranked.c.position <= RELATION_LIST_SIZE)
+            .order_by(Tag.name)
+        )
+        return group_pairs(await self.all(statement))
+
+
+def position(parent, *order_by):
+    """
+    The place of a row in its parent's list. Relation lists are cut at
+    RELATION_LIST_SIZE rows per parent in SQL, the size the query cost
+    limits assume.
+    """
+    return (
+        func.row_number().over(partition_by=parent, order_by=order_by).label("position")
+    )
+
+
+def group(rows, key) -> dict:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[key(row)].append(row)
+    return grouped
+
+
+def group_pairs(rows) -> dict:
+    grouped = defaultdict(list)
+    for key, row in rows:
+        grouped[key].append(row)
+    return grouped
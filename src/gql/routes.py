@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .schemas import GraphQLQueryModel
+from .service import GraphQLService
+from src.db.main import get_session
+from src.auth.dependencies import RoleChecker
+
+gql_router = APIRouter()
+gql_service = GraphQLService()
+role_checker = Depends(RoleChecker(["admin", "user"]))
+
+
+@gql_router.post("", dependencies=[role_checker])
+async def graphql_query(
+    query_data: GraphQLQueryModel,
+    session: AsyncSession = Depends(get_session),
+):
+    """Read-only GraphQL over users, books, reviews and tags"""
+    status_code, result = await gql_service.execute_query(
+        query_data.query,
+        session,
+        variables=query_data.variables,
+        operation_name=query_data.operation_name,
+    )
+    return JSONResponse(content=result, status_code=status_code)
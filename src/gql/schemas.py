@@ -0,0 +1,8 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class GraphQLQueryModel(BaseModel):
+    query: str
+    variables: Optional[dict] = None
+    operation_name: Optional[str] = Field(None, alias="operationName")
@@ -0,0 +1,43 @@
+from inspect import isawaitable
+from typing import Optional
+from graphql import GraphQLError, execute, parse, specified_rules, validate
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .limits import QueryLimitsRule
+from .loaders import Loaders
+from .types import schema
+
+VALIDATION_RULES = (*specified_rules, QueryLimitsRule)
+
+
+class GraphQLService:
+    async def execute_query(
+        self,
+        query: str,
+        session: AsyncSession,
+        variables: Optional[dict] = None,
+        operation_name: Optional[str] = None,
+    ):
+        """
+        Run a query and return the HTTP status with the GraphQL response.
+        Queries that do not parse or fail validation, including the depth
+        and cost limits, are rejected before anything is executed.
+        """
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return 400, {"errors": [e.formatted]}
+        errors = validate(schema, document, VALIDATION_RULES)
+        if errors:
+            return 400, {"errors": [error.formatted for error in errors]}
+
+        result = execute(
+            schema,
+            document,
+            variable_values=variables,
+            operation_name=operation_name,
+            context_value={"loaders": Loaders(session)},
+        )
+        if isawaitable(result):
+            result = await result
+        return 200, result.formatted
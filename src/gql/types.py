@@ -0,0 +1,203 @@
+import uuid
+from datetime import date, datetime
+from graphql import (
+    GraphQLArgument,
+    GraphQLBoolean,
+    GraphQLField,
+    GraphQLFloat,
+    GraphQLInt,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+    GraphQLSchema,
+    GraphQLString,
+)
+from sqlmodel import select, desc
+
+from src.db.models import Book, Review, Tag
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Resolvers never touch ORM relationships: related rows come from the
+# request's batch loaders (info.context["loaders"]), one query per relation
+# and nesting level.
+
+
+def parse_literal(parse):
+    return lambda node, _variables=None: parse(node.value)
+
+
+UUIDType = GraphQLScalarType(
+    "UUID",
+    serialize=str,
+    parse_value=uuid.UUID,
+    parse_literal=parse_literal(uuid.UUID),
+)
+DateType = GraphQLScalarType(
+    "Date",
+    serialize=date.isoformat,
+    parse_value=date.fromisoformat,
+    parse_literal=parse_literal(date.fromisoformat),
+)
+DateTimeType = GraphQLScalarType(
+    "DateTime",
+    serialize=datetime.isoformat,
+    parse_value=datetime.fromisoformat,
+    parse_literal=parse_literal(datetime.fromisoformat),
+)
+
+
+def required(type_):
+    return GraphQLNonNull(type_)
+
+
+def list_of(type_):
+    return required(GraphQLList(required(type_)))
+
+
+def load_one(loader_name: str, key_attr: str):
+    def resolve(obj, info):
+        key = getattr(obj, key_attr)
+        if key is None:
+            return None
+        return getattr(info.context["loaders"], loader_name).load(key)
+
+    return resolve
+
+
+def load_many(loader_name: str, key_attr: str = "uid"):
+    async def resolve(obj, info):
+        loader = getattr(info.context["loaders"], loader_name)
+        return await loader.load(getattr(obj, key_attr)) or []
+
+    return resolve
+
+
+UserType = GraphQLObjectType(
+    "User",
+    lambda: {
+        "uid": GraphQLField(required(UUIDType)),
+        "username": GraphQLField(required(GraphQLString)),
+        "first_name": GraphQLField(required(GraphQLString)),
+        "last_name": GraphQLField(required(GraphQLString)),
+        "is_verufied": GraphQLField(required(GraphQLBoolean)),
+        "created_at": GraphQLField(DateTimeType),
+        "books": GraphQLField(list_of(BookType), resolve=load_many("books_by_user")),
+        "reviews": GraphQLField(
+            list_of(ReviewType), resolve=load_many("reviews_by_user")
+        ),
+    },
+)
+
+BookType = GraphQLObjectType(
+    "Book",
+    lambda: {
+        "uid": GraphQLField(required(UUIDType)),
+        "title": GraphQLField(required(GraphQLString)),
+        "author": GraphQLField(required(GraphQLString)),
+        "publisher": GraphQLField(required(GraphQLString)),
+        "published_date": GraphQLField(required(DateType)),
+        "page_count": GraphQLField(required(GraphQLInt)),
+        "language": GraphQLField(required(GraphQLString)),
+        "created_at": GraphQLField(DateTimeType),
+        "updated_at": GraphQLField(DateTimeType),
+        "version": GraphQLField(required(GraphQLInt)),
+        "review_count": GraphQLField(required(GraphQLInt)),
+        "rating_sum": GraphQLField(required(GraphQLInt)),
+        "average_rating": GraphQLField(required(GraphQLFloat)),
+        "user": GraphQLField(UserType, resolve=load_one("user", "user_uid")),
+        "reviews": GraphQLField(
+            list_of(ReviewType), resolve=load_many("reviews_by_book")
+        ),
+        "tags": GraphQLField(list_of(TagType), resolve=load_many("tags_by_book")),
+    },
+)
+
+ReviewType = GraphQLObjectType(
+    "Review",
+    lambda: {
+        "uid": GraphQLField(required(UUIDType)),
+        "rating": GraphQLField(required(GraphQLInt)),
+        "review_text": GraphQLField(required(GraphQLString)),
+        "created_at": GraphQLField(DateTimeType),
+        "updated_at": GraphQLField(DateTimeType),
+        "user": GraphQLField(UserType, resolve=load_one("user", "user_uid")),
+        "book": GraphQLField(BookType, resolve=load_one("book", "book_uid")),
+    },
+)
+
+TagType = GraphQLObjectType(
+    "Tag",
+    lambda: {
+        "uid": GraphQLField(required(UUIDType)),
+        "name": GraphQLField(required(GraphQLString)),
+        "created_at": GraphQLField(DateTimeType),
+        "books": GraphQLField(list_of(BookType), resolve=load_many("books_by_tag")),
+    },
+)
+
+
+def limit_argument():
+    return GraphQLArgument(
+        GraphQLInt,
+        default_value=DEFAULT_PAGE_SIZE,
+        description=f"At most {MAX_PAGE_SIZE}",
+    )
+
+
+async def resolve_list(info, statement, limit: int):
+    limit = max(0, min(limit, MAX_PAGE_SIZE))
+    return await info.context["loaders"].all(statement.limit(limit))
+
+
+async def resolve_books(_root, info, limit: int):
+    statement = select(Book).order_by(desc(Book.created_at), desc(Book.uid))
+    return await resolve_list(info, statement, limit)
+
+
+async def resolve_reviews(_root, info, limit: int):
+    statement = select(Review).order_by(desc(Review.created_at), desc(Review.uid))
+    return await resolve_list(info, statement, limit)
+
+
+async def resolve_tags(_root, info, limit: int):
+    statement = select(Tag).order_by(Tag.name, Tag.uid)
+    return await resolve_list(info, statement, limit)
+
+
+def load_by_uid(loader_name: str):
+    def resolve(_root, info, uid):
+        return getattr(info.context["loaders"], loader_name).load(uid)
+
+    return resolve
+
+
+QueryType = GraphQLObjectType(
+    "Query",
+    {
+        "book": GraphQLField(
+            BookType,
+            args={"uid": GraphQLArgument(required(UUIDType))},
+            resolve=load_by_uid("book"),
+        ),
+        "user": GraphQLField(
+            UserType,
+            args={"uid": GraphQLArgument(required(UUIDType))},
+            resolve=load_by_uid("user"),
+        ),
+        "books": GraphQLField(
+            list_of(BookType), args={"limit": limit_argument()}, resolve=resolve_books
+        ),
+        "reviews": GraphQLField(
+            list_of(ReviewType),
+            args={"limit": limit_argument()},
+            resolve=resolve_reviews,
+        ),
+        "tags": GraphQLField(
+            list_of(TagType), args={"limit": limit_argument()}, resolve=resolve_tags
+        ),
+    },
+)
+
+# no mutation type: the endpoint is read-only
+schema = GraphQLSchema(query=QueryType)
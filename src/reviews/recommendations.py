@@ -0,0 +1,207 @@
+import uuid
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from src.books.related import csr, positions
+
+# recommendations kept per user, the most GET /auth/me/recommendations returns
+RECOMMENDATION_LIMIT = 20
+# most similar books kept per book, the candidates of the recommendations
+NEIGHBOUR_LIMIT = 50
+# reviewers of more books than this are left out of the similarities, they
+# cost the square of their review count and say little about any one pair
+MAX_USER_REVIEWS = 1000
+
+
+def top(items: np.ndarray, scores: np.ndarray, limit: int):
+    """The `limit` best scored items, best first"""
+    if len(items) > limit:
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        items, scores = items[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return items[order], scores[order]
+
+
+def weighted_sum(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    values: np.ndarray,
+    rows: np.ndarray,
+    weights: np.ndarray,
+):
+    """The sum of several sparse rows, each scaled by its weight"""
+    at = positions(indptr, rows)
+    products = np.repeat(weights, np.diff(indptr)[rows]) * values[at]
+    columns, inverse = np.unique(indices[at], return_inverse=True)
+    return columns, np.bincount(inverse, products, minlength=len(columns))
+
+
+class RatingMatrixBuilder:
+    """Collects batches of (user uid, book uid, rating) rows into a RatingMatrix"""
+
+    def __init__(self) -> None:
+        self.user_index: Dict[uuid.UUID, int] = {}
+        self.book_index: Dict[uuid.UUID, int] = {}
+        self.chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    def add(self, reviews: Sequence) -> None:
+        users = self.user_index
+        books = self.book_index
+        count = len(reviews)
+        self.chunks.append(
+            (
+                np.fromiter(
+                    (users.setdefault(uid, len(users)) for uid, _, _ in reviews),
+                    dtype=np.int32,
+                    count=count,
+                ),
+                np.fromiter(
+                    (books.setdefault(uid, len(books)) for _, uid, _ in reviews),
+                    dtype=np.int32,
+                    count=count,
+                ),
+                np.fromiter(
+                    (rating for _, _, rating in reviews), dtype=np.float32, count=count
+                ),
+            )
+        )
+
+    def build(self) -> "RatingMatrix":
+        users, books, ratings = (
+            np.concatenate([chunk[i] for chunk in self.chunks])
+            if self.chunks
+            else np.empty(0, dtype=np.float32 if i == 2 else np.int32)
+            for i in range(3)
+        )
+        self.chunks = []
+        # every review is a vote for the book, weighted by its 0-4 rating
+        return RatingMatrix(
+            users, books, ratings + 1, list(self.user_index), list(self.book_index)
+        )
+
+
+class RatingMatrix:
+    """
+    The user x book matrix of review weights, stored as compressed sparse rows
+    both ways (the books of a user, the users of a book). Books are related by
+    the cosine similarity of their columns and users are recommended the
+    nearest neighbours of the books they reviewed.
+    """
+
+    def __init__(
+        self,
+        users: np.ndarray,
+        books: np.ndarray,
+        weights: np.ndarray,
+        user_uids: List[uuid.UUID],
+        book_uids: List[uuid.UUID],
+    ) -> None:
+        self.user_uids = user_uids
+        self.book_uids = book_uids
+        # csr of the entry numbers, which orders the indices and the values
+        self.user_indptr, order = csr(users, np.arange(len(users)), len(user_uids))
+        self.user_books, self.user_weights = books[order], weights[order]
+        self.book_indptr, order = csr(books, np.arange(len(books)), len(book_uids))
+        self.book_users, self.book_weights = users[order], weights[order]
+        self.book_norms = np.sqrt(
+            np.bincount(
+                books, weights.astype(np.float64) ** 2, minlength=len(book_uids)
+            )
+        )
+        self.neighbour_indptr = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in vars(self).values()
+            if isinstance(array, np.ndarray)
+        )
+
+    def similar_books(self, book: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The NEIGHBOUR_LIMIT books most similar to a book and their cosine"""
+        start, end = self.book_indptr[book], self.book_indptr[book + 1]
+        users, weights = self.book_users[start:end], self.book_weights[start:end]
+        keep = np.diff(self.user_indptr)[users] <= MAX_USER_REVIEWS
+        others, dots = weighted_sum(
+            self.user_indptr,
+            self.user_books,
+            self.user_weights,
+            users[keep],
+            weights[keep],
+        )
+        keep = others != book
+        others, dots = others[keep], dots[keep]
+        return top(
+            others,
+            dots / (self.book_norms[book] * self.book_norms[others]),
+            NEIGHBOUR_LIMIT,
+        )
+
+    def compute_neighbours(self) -> None:
+        """The similar books of every book, as compressed sparse rows"""
+        neighbours = [self.similar_books(book) for book in range(len(self.book_uids))]
+        self.neighbour_indptr = np.zeros(len(neighbours) + 1, dtype=np.int64)
+        np.cumsum(
+            [len(books) for books, _ in neighbours], out=self.neighbour_indptr[1:]
+        )
+        self.neighbour_books = np.concatenate(
+            [books for books, _ in neighbours] or [np.empty(0, dtype=np.int32)]
+        )
+        self.neighbour_scores = np.concatenate(
+            [scores for _, scores in neighbours] or [np.empty(0)]
+        )
+
+    def recommended_books(self, user: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The RECOMMENDATION_LIMIT books the user has not reviewed that are the
+        most similar to the ones they did, weighted by their ratings
+        """
+        if self.neighbour_indptr is None:
+            self.compute_neighbours()
+        start, end = self.user_indptr[user], self.user_indptr[user + 1]
+        books, weights = self.user_books[start:end], self.user_weights[start:end]
+        candidates, scores = weighted_sum(
+            self.neighbour_indptr,
+            self.neighbour_books,
+            self.neighbour_scores,
+            books,
+            weights,
+        )
+        keep = ~np.isin(candidates, books)
+        return top(candidates[keep], scores[keep], RECOMMENDATION_LIMIT)
+
+    def recommend(self, user: int) -> List[Tuple[uuid.UUID, float]]:
+        """The recommended books of a user as (book uid, score)"""
+        candidates, scores = self.recommended_books(user)
+        return [
+            (self.book_uids[book], float(score))
+            for book, score in zip(candidates, scores)
+        ]
+
+    def recommendations(self) -> Iterator[Tuple[uuid.UUID, List]]:
+        """(user uid, recommendations) of every user with any"""
+        for user, user_uid in enumerate(self.user_uids):
+            recommended = self.recommend(user)
+            if recommended:
+                yield user_uid, recommended
+
+    def recommendation_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The (user, book, score) index arrays of the recommendations of every
+        user, a few bytes per row, so all of them fit in memory at once
+        """
+        counts = np.zeros(len(self.user_uids), dtype=np.int64)
+        books, scores = [], []
+        for user in range(len(self.user_uids)):
+            candidates, user_scores = self.recommended_books(user)
+            counts[user] = len(candidates)
+            books.append(candidates)
+            scores.append(user_scores)
+        users = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        return (
+            users,
+            np.concatenate(books or [np.empty(0, dtype=np.int32)]),
+            np.concatenate(scores or [np.empty(0)]),
+        )
@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends, status
+import uuid
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import ReviewCreateModel
+from .schemas import (
+    ReviewCreateModel,
+    ReviewFilterModel,
+    ReviewModel,
+    ReviewPageModel,
+)
 from .service import ReviewService
 from src.db.models import User
 from src.db.main import get_session
-from src.auth.dependencies import get_current_user, RoleChecker
+from src.db.export import EXPORT_MEDIA_TYPES
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.books.service import BookService
+from src.auth.dependencies import AccessTokenBearer, get_current_user, RoleChecker
+from src.errors import BookNotFound
 
 review_router = APIRouter()
 review_service = ReviewService()
+book_service = BookService()
+access_token_bearer = AccessTokenBearer()
 admin_role_checker = Depends(RoleChecker(["admin"]))
 user_role_checker = Depends(RoleChecker(["user", "admin"]))
 
@@ -19,22 +33,55 @@ async def get_all_reviews(session: AsyncSession = Depends(get_session)):
     return books
 
 
+@review_router.get("/export", dependencies=[admin_role_checker])
+async def export_reviews(format: Literal["ndjson", "csv"] = "ndjson"):
+    return StreamingResponse(
+        review_service.export_reviews(format), media_type=EXPORT_MEDIA_TYPES[format]
+    )
+
+
+@review_router.get(
+    "/book/{book_uid}", response_model=ReviewPageModel, dependencies=[user_role_checker]
+)
+async def get_book_reviews(
+    book_uid: uuid.UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["newest", "rating"] = "newest",
+    filters: ReviewFilterModel = Depends(),
+    session: AsyncSession = Depends(get_session),
+):
+    page = await review_service.get_book_reviews(
+        book_uid, session, limit=limit, cursor=cursor, sort=sort, filters=filters
+    )
+    # an empty first page is the only case where the book may not exist
+    if not page["items"] and cursor is None:
+        if await book_service.get_book_version(book_uid, session) is None:
+            raise BookNotFound()
+    return page
+
+
 @review_router.get("/{review_uid}", dependencies=[user_role_checker])
-async def get_review(review_uid: str, session: AsyncSession = Depends(get_session)):
+async def get_review(
+    review_uid: uuid.UUID, session: AsyncSession = Depends(get_session)
+):
     book = await review_service.get_review(review_uid, session=session)
     if not book:
         raise
 
 
-@review_router.post("/book/{book_uid}", dependencies=[user_role_checker])
+@review_router.post(
+    "/book/{book_uid}", response_model=ReviewModel, dependencies=[user_role_checker]
+)
 async def add_review_to_book(
-    book_uid: str,
+    book_uid: uuid.UUID,
     review_data: ReviewCreateModel,
-    current_user: User = Depends(get_current_user),
+    token_details: dict = Depends(access_token_bearer),
     session: AsyncSession = Depends(get_session),
 ):
+    """Review a book, or replace your earlier review of it"""
     new_review = await review_service.add_review_to_book(
-        user_email=current_user.email,
+        user_uid=uuid.UUID(token_details["user"]["user_uid"]),
         book_uid=book_uid,
         review_data=review_data,
         session=session,
@@ -48,7 +95,7 @@ async def add_review_to_book(
     status_code=status.HTTP_204_NO_CONTENT,
 )
 async def delete_review(
-    review_uid: str,
+    review_uid: uuid.UUID,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
@@ -1,19 +1,39 @@
 import uuid
-from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
 
 
 class ReviewModel(BaseModel):
     uid: uuid.UUID
-    rating: int = Field(lt=5)
+    rating: int = Field(ge=0, lt=5)
     review_text: str
     user_uid: Optional[uuid.UUID]
     book_uid: Optional[uuid.UUID]
     created_at: datetime
     updated_at: datetime
+    version: int
 
 
 class ReviewCreateModel(BaseModel):
-    rating: int = Field(lt=5)
+    rating: int = Field(ge=0, lt=5)
     review_text: str
+
+
+class ReviewFilterModel(BaseModel):
+    min_rating: Optional[int] = Field(None, ge=0, lt=5)
+    max_rating: Optional[int] = Field(None, ge=0, lt=5)
+    since: Optional[datetime] = None
+
+    @field_validator("since")
+    @classmethod
+    def naive_utc(cls, since: Optional[datetime]) -> Optional[datetime]:
+        # created_at is a naive UTC timestamp
+        if since is not None and since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return since
+
+
+class ReviewPageModel(BaseModel):
+    items: List[ReviewModel]
+    next_cursor: Optional[str]
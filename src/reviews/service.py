@@ -1,74 +1,208 @@
-import logging
+import uuid
+import numpy as np
+from datetime import datetime
+from typing import Optional
 from fastapi import status
 from fastapi.exceptions import HTTPException
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import select, desc
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import ReviewCreateModel
-from src.db.models import Review
+from .schemas import ReviewCreateModel, ReviewFilterModel, ReviewModel
+from .recommendations import RatingMatrixBuilder
+from src.db.export import stream_export
+from src.db.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
+from src.db.models import Review, UserRecommendation
 from src.auth.service import UserService
+from src.books.cache import book_detail_cache
 from src.books.service import BookService
+from src.errors import BookNotFound, UserNotFound
 
 book_service = BookService()
 user_service = UserService()
 
+REVIEW_FIELDS = tuple(ReviewModel.model_fields)
+RATING_BATCH_SIZE = 10000
+RECOMMENDATION_INSERT_BATCH_SIZE = 5000
+
+# orders of the reviews of a book -> (keyset columns, cursor value parsers),
+# rows come newest / best rated first, each order has a matching index
+REVIEW_SORTS = {
+    "newest": (("created_at", "uid"), (datetime.fromisoformat, uuid.UUID)),
+    "rating": (
+        ("rating", "created_at", "uid"),
+        (int, datetime.fromisoformat, uuid.UUID),
+    ),
+}
+
 
 class ReviewService:
     async def add_review_to_book(
         self,
-        user_email: str,
-        book_uid: str,
+        user_uid: uuid.UUID,
+        book_uid: uuid.UUID,
         review_data: ReviewCreateModel,
         session: AsyncSession,
     ):
-        try:
-            book = await book_service.get_book(book_uid=book_uid, session=session)
-            user = await user_service.get_user_by_email(
-                email=user_email, session=session
+        """
+        Write the user's review of a book with one INSERT ... ON CONFLICT
+        ... RETURNING, replacing the previous review by the same user.
+        """
+        if not await book_service.count_user_rating(
+            session, book_uid, user_uid, review_data.rating
+        ):
+            await session.rollback()
+            raise BookNotFound()
+
+        statement = insert(Review).values(
+            **review_data.model_dump(), user_uid=user_uid, book_uid=book_uid
+        )
+        statement = (
+            statement.on_conflict_do_update(
+                index_elements=[Review.user_uid, Review.book_uid],
+                set_={
+                    "rating": statement.excluded.rating,
+                    "review_text": statement.excluded.review_text,
+                    "updated_at": datetime.now(),
+                    "version": Review.version + 1,
+                },
             )
-            review_data_dict = review_data.model_dump()
-            if not book:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Book not found",
-                )
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User not found",
-                )
-            new_review = Review(**review_data_dict, user=user, book=book)
-            # new_review.user = user
-            # new_review.book = book
-            session.add(new_review)
+            .returning(*[getattr(Review, field) for field in REVIEW_FIELDS])
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            results = await session.exec(statement)
+            review = results.first()
             await session.commit()
-            return new_review
-        except Exception as e:
-            logging.exception(e)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Oops ... Something went wrong",
-            )
+        except IntegrityError:
+            # the book row is locked, only the user can have gone missing
+            await session.rollback()
+            raise UserNotFound()
+        await book_detail_cache.invalidate(str(book_uid))
+        return dict(review._mapping)
 
     async def get_review(self, review_uid: str, session: AsyncSession):
         statement = select(Review).where(Review.uid == review_uid)
         results = await session.exec(statement)
         return results.first()
 
+    async def get_book_reviews(
+        self,
+        book_uid: uuid.UUID,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        sort: str = "newest",
+        filters: Optional[ReviewFilterModel] = None,
+    ):
+        """
+        One page of the reviews of a book. A keyset over the sort columns
+        keeps every page an index range scan, however deep it is.
+        """
+        names, parsers = REVIEW_SORTS[sort]
+        keyset = [getattr(Review, name) for name in names]
+        statement = select(Review).where(Review.book_uid == book_uid)
+        if filters is not None:
+            if filters.min_rating is not None:
+                statement = statement.where(Review.rating >= filters.min_rating)
+            if filters.max_rating is not None:
+                statement = statement.where(Review.rating <= filters.max_rating)
+            if filters.since is not None:
+                statement = statement.where(Review.created_at >= filters.since)
+        after = decode_cursor(cursor, *parsers)
+        if after is not None:
+            statement = statement.where(tuple_(*keyset) < tuple(after))
+        statement = statement.order_by(*[desc(column) for column in keyset])
+        results = await session.exec(statement.limit(limit + 1))
+        reviews = results.all()
+
+        next_cursor = None
+        if len(reviews) > limit:
+            reviews = reviews[:limit]
+            next_cursor = encode_cursor(*[getattr(reviews[-1], name) for name in names])
+        return {"items": reviews, "next_cursor": next_cursor}
+
     async def get_all_reviews(self, session: AsyncSession):
         statement = select(Review).order_by(desc(Review.created_at))
         result = await session.exec(statement)
         return result.all()
 
+    def export_reviews(self, export_format: str):
+        columns = [getattr(Review, field) for field in REVIEW_FIELDS]
+        statement = select(*columns).order_by(Review.created_at, Review.uid)
+        return stream_export(statement, export_format)
+
+    async def rebuild_recommendations(self, session: AsyncSession):
+        """
+        Build the user x book rating matrix from the reviews, read through a
+        server-side cursor RATING_BATCH_SIZE rows at a time, compute the
+        recommendations of every user, then replace them all in one short
+        transaction. Returns the number of users with recommendations.
+        """
+        statement = select(Review.user_uid, Review.book_uid, Review.rating).where(
+            Review.user_uid.is_not(None), Review.book_uid.is_not(None)
+        )
+        result = await session.stream(
+            statement.execution_options(yield_per=RATING_BATCH_SIZE)
+        )
+        builder = RatingMatrixBuilder()
+        async for rows in result.partitions():
+            builder.add(rows)
+        # end the read transaction, the similarities take minutes and nothing
+        # should stay open on the database meanwhile
+        await session.commit()
+        matrix = builder.build()
+        users, books, scores = matrix.recommendation_arrays()
+
+        await session.exec(delete(UserRecommendation))
+        for start in range(0, len(users), RECOMMENDATION_INSERT_BATCH_SIZE):
+            end = start + RECOMMENDATION_INSERT_BATCH_SIZE
+            rows = [
+                {
+                    "user_uid": matrix.user_uids[user],
+                    "book_uid": matrix.book_uids[book],
+                    "score": score,
+                }
+                for user, book, score in zip(
+                    users[start:end].tolist(),
+                    books[start:end].tolist(),
+                    scores[start:end].tolist(),
+                )
+            ]
+            await session.exec(insert(UserRecommendation), params=rows)
+        await session.commit()
+        return len(np.unique(users))
+
     async def delete_review_to_from_book(
         self, review_uid: str, user_email: str, session: AsyncSession
     ):
         user = await user_service.get_user_by_email(user_email, session)
         review = await self.get_review(review_uid, session)
-        if not review or (review.user != user):
+        if not review or (review.user_uid != user.uid):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Cannot delete this review",
+            )
+        # the book row first, in the same order as the review upsert, then the
+        # rating actually deleted, which a concurrent update may have changed
+        await book_service.lock_book(session, review.book_uid)
+        statement = (
+            delete(Review)
+            .where(Review.uid == review.uid, Review.user_uid == user.uid)
+            .returning(Review.rating)
+        )
+        results = await session.exec(statement)
+        rating = results.scalar_one_or_none()
+        if rating is None:
+            # deleted by a concurrent request after it was read
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Cannot delete this review",
             )
-        await session.delete(review)
+        await book_service.adjust_rating_aggregates(
+            session, review.book_uid, removed=rating
+        )
         await session.commit()
+        await book_detail_cache.invalidate(str(review.book_uid))
@@ -1,24 +1,55 @@
-from typing import List
-from fastapi import APIRouter, Depends, status
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .service import TagService
-from .schemas import TagModel, TagCreateModel, TagAddModel
+from .schemas import (
+    TagModel,
+    TagCreateModel,
+    TagAddModel,
+    TagBulkAddModel,
+    TagBulkAddResultModel,
+    TagPageModel,
+)
 from src.db.main import get_session
 from src.auth.dependencies import RoleChecker
-from src.books.schemas import Book
+from src.books.schemas import Book, BookPageModel
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.errors import TagNotFound
 
 tags_router = APIRouter()
 tag_service = TagService()
 user_role_checker = Depends(RoleChecker(["admin", "user"]))
 
 
-@tags_router.get("", response_model=List[TagModel], dependencies=[user_role_checker])
-async def get_all_tags(session: AsyncSession = Depends(get_session)):
-    tags = await tag_service.get_tags(session)
+@tags_router.get("", response_model=TagPageModel, dependencies=[user_role_checker])
+async def get_all_tags(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    tags = await tag_service.get_tags(session, limit=limit, cursor=cursor)
     return tags
 
 
+@tags_router.get(
+    "/{tag_uid}/books", response_model=BookPageModel, dependencies=[user_role_checker]
+)
+async def get_tag_books(
+    tag_uid: uuid.UUID,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    page = await tag_service.get_tag_books(tag_uid, session, limit=limit, cursor=cursor)
+    # an empty first page is the only case where the tag may not exist
+    if not page["items"] and cursor is None:
+        if await tag_service.get_tag_by_uid(tag_uid, session) is None:
+            raise TagNotFound()
+    return page
+
+
 @tags_router.post(
     "",
     response_model=TagModel,
@@ -36,7 +67,9 @@ async def add_tag(
     "/book/{book_uid}/tags", response_model=Book, dependencies=[user_role_checker]
 )
 async def add_tags_to_book(
-    book_uid: str, tag_data: TagAddModel, session: AsyncSession = Depends(get_session)
+    book_uid: uuid.UUID,
+    tag_data: TagAddModel,
+    session: AsyncSession = Depends(get_session),
 ) -> Book:
     book_with_tag = await tag_service.add_tags_to_book(
         book_uid=book_uid, tag_data=tag_data, session=session
@@ -44,11 +77,22 @@ async def add_tags_to_book(
     return book_with_tag
 
 
+@tags_router.post(
+    "/books", response_model=TagBulkAddResultModel, dependencies=[user_role_checker]
+)
+async def add_tags_to_books(
+    bulk_data: TagBulkAddModel, session: AsyncSession = Depends(get_session)
+):
+    """Add the same tags to many books at once; unknown books are reported"""
+    result = await tag_service.add_tags_to_books(bulk_data, session)
+    return result
+
+
 @tags_router.put(
     "/{tag_uid}", response_model=TagModel, dependencies=[user_role_checker]
 )
 async def update_tag(
-    tag_uid: str,
+    tag_uid: uuid.UUID,
     tag_update_data: TagCreateModel,
     session: AsyncSession = Depends(get_session),
 ) -> TagModel:
@@ -63,7 +107,7 @@ async def update_tag(
     dependencies=[user_role_checker],
 )
 async def delete_tag(
-    tag_uid: str, session: AsyncSession = Depends(get_session)
+    tag_uid: uuid.UUID, session: AsyncSession = Depends(get_session)
 ) -> None:
     updated_tag = await tag_service.delete_tag(tag_uid, session)
 
@@ -1,13 +1,23 @@
 import uuid
-from typing import List
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class TagModel(BaseModel):
     uid: uuid.UUID
     name: str
     created_at: datetime
+    version: int
+
+
+class TagCountModel(TagModel):
+    book_count: int
+
+
+class TagPageModel(BaseModel):
+    items: List[TagCountModel]
+    next_cursor: Optional[str]
 
 
 class TagCreateModel(BaseModel):
@@ -16,3 +26,14 @@ class TagCreateModel(BaseModel):
 
 class TagAddModel(BaseModel):
     tags: List[TagCreateModel]
+
+
+class TagBulkAddModel(BaseModel):
+    book_uids: List[uuid.UUID] = Field(min_length=1, max_length=1000)
+    tags: List[TagCreateModel] = Field(min_length=1, max_length=100)
+
+
+class TagBulkAddResultModel(BaseModel):
+    tags: List[TagModel]
+    tagged: List[uuid.UUID]
+    missing: List[uuid.UUID]
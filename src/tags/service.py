@@ -1,59 +1,202 @@
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
 from fastapi import status
 from fastapi.exceptions import HTTPException
+from sqlalchemy import delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import desc, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .schemas import TagAddModel, TagCreateModel
+from .schemas import TagAddModel, TagBulkAddModel, TagCreateModel, TagModel
 
+from src.books.cache import book_detail_cache
 from src.books.service import BookService
-from src.db.models import Tag
+from src.celery_tasks import update_related_books
+from src.db.models import Book, BookTag, Tag
+from src.db.pagination import DEFAULT_PAGE_SIZE, encode_cursor, decode_cursor
 from src.errors import BookNotFound, TagNotFound, TagAlreadyExists
 
 
 book_service = BookService()
+TAG_FIELDS = tuple(TagModel.model_fields)
+# links per INSERT, two bind parameters each, well under the 32767 asyncpg
+# takes in one statement
+LINK_INSERT_BATCH_SIZE = 5000
 server_error = HTTPException(
     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Something went wrong"
 )
 
 
 class TagService:
-    async def get_tags(self, session: AsyncSession):
-        statement = select(Tag).order_by(desc(Tag.created_at))
-        result = await session.exec(statement)
-        return result.all()
+    async def get_tags(
+        self,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """
+        A page of tags, newest first, each with the number of books it is
+        on. The counts are correlated subqueries, so only the tags of the
+        page are counted, each from the booktag (tag_id, book_id) index.
+        """
+        book_count = (
+            select(func.count())
+            .where(BookTag.tag_id == Tag.uid)
+            .scalar_subquery()
+            .label("book_count")
+        )
+        statement = select(*[getattr(Tag, field) for field in TAG_FIELDS], book_count)
+        after = decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+        if after is not None:
+            statement = statement.where(tuple_(Tag.created_at, Tag.uid) < tuple(after))
+        statement = statement.order_by(desc(Tag.created_at), desc(Tag.uid))
+        results = await session.exec(statement.limit(limit + 1))
+        tags = results.all()
+
+        next_cursor = None
+        if len(tags) > limit:
+            tags = tags[:limit]
+            next_cursor = encode_cursor(tags[-1].created_at, tags[-1].uid)
+        return {
+            "items": [dict(tag._mapping) for tag in tags],
+            "next_cursor": next_cursor,
+        }
+
+    async def get_tag_books(
+        self,
+        tag_uid: uuid.UUID,
+        session: AsyncSession,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ):
+        """
+        A page of the books with a tag. Pages follow the booktag
+        (tag_id, book_id) index, so they are ordered by book uid.
+        """
+        statement = (
+            select(Book)
+            .join(BookTag, BookTag.book_id == Book.uid)
+            .where(BookTag.tag_id == tag_uid)
+        )
+        after = decode_cursor(cursor, uuid.UUID)
+        if after is not None:
+            statement = statement.where(BookTag.book_id > after[0])
+        statement = statement.order_by(BookTag.book_id).limit(limit + 1)
+        results = await session.exec(statement)
+        books = results.all()
+
+        next_cursor = None
+        if len(books) > limit:
+            books = books[:limit]
+            next_cursor = encode_cursor(books[-1].uid)
+        return {"items": books, "next_cursor": next_cursor}
+
+    async def upsert_tags(
+        self, names: List[str], session: AsyncSession
+    ) -> Dict[str, dict]:
+        """
+        Make sure a tag exists for every name, in the caller's transaction.
+        New tags are created with one INSERT ... ON CONFLICT DO NOTHING
+        RETURNING, the ones that already existed are read with one SELECT.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        columns = [getattr(Tag, field) for field in TAG_FIELDS]
+        statement = (
+            insert(Tag)
+            .values([{"uid": uuid.uuid4(), "name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(*columns)
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        tags = {row.name: dict(row._mapping) for row in results.all()}
+        existing = [name for name in names if name not in tags]
+        if existing:
+            results = await session.exec(select(*columns).where(Tag.name.in_(existing)))
+            tags.update({row.name: dict(row._mapping) for row in results.all()})
+        return tags
+
+    async def link_tags(self, book_uids, tag_uids, session: AsyncSession):
+        """Tag every book with every tag, skipping the existing links"""
+        links = [
+            {"book_id": book_uid, "tag_id": tag_uid}
+            for book_uid in book_uids
+            for tag_uid in tag_uids
+        ]
+        for start in range(0, len(links), LINK_INSERT_BATCH_SIZE):
+            batch = links[start : start + LINK_INSERT_BATCH_SIZE]
+            await session.exec(insert(BookTag).values(batch).on_conflict_do_nothing())
 
     async def add_tags_to_book(
-        self, book_uid: str, tag_data: TagAddModel, session: AsyncSession
+        self, book_uid: uuid.UUID, tag_data: TagAddModel, session: AsyncSession
     ):
-        book = await book_service.get_book(book_uid=book_uid, session=session)
-        if not book:
+        # bumping the version first also tells whether the book exists
+        if not await book_service.touch_books(session, book_uid):
+            await session.rollback()
             raise BookNotFound()
-        for tag_item in tag_data.tags:
-            result = await session.exec(select(Tag).where(Tag.name == tag_item.name))
-            tag = result.one_or_none()
-            if not tag:
-                tag = Tag(name=tag_item.name)
-            book.tags.append(tag)
-        session.add(book)
+        tags = await self.upsert_tags([tag.name for tag in tag_data.tags], session)
+        await self.link_tags([book_uid], [tag["uid"] for tag in tags.values()], session)
+        await session.commit()
+        await book_detail_cache.invalidate(str(book_uid))
+        update_related_books.delay([str(book_uid)])
+        return await book_service.get_book(book_uid, session)
+
+    async def add_tags_to_books(
+        self, bulk_data: TagBulkAddModel, session: AsyncSession
+    ):
+        """Apply one tag set to many books in a single transaction"""
+        book_uids = list(dict.fromkeys(bulk_data.book_uids))
+        tagged = set(await book_service.touch_books(session, *book_uids))
+        tags = await self.upsert_tags([tag.name for tag in bulk_data.tags], session)
+        await self.link_tags(
+            [uid for uid in book_uids if uid in tagged],
+            [tag["uid"] for tag in tags.values()],
+            session,
+        )
         await session.commit()
-        await session.refresh(book)
-        return book
+        await book_detail_cache.invalidate(*[str(uid) for uid in tagged])
+        if tagged:
+            update_related_books.delay([str(uid) for uid in tagged])
+        return {
+            "tags": list(tags.values()),
+            "tagged": [uid for uid in book_uids if uid in tagged],
+            "missing": [uid for uid in book_uids if uid not in tagged],
+        }
 
-    async def get_tag_by_uid(self, tag_uid: str, session: AsyncSession):
-        statement = select(Tag).where(Tag.uid == tag_uid)
+    async def get_tag_by_uid(
+        self, tag_uid: str, session: AsyncSession, options: Sequence = ()
+    ):
+        statement = select(Tag).where(Tag.uid == tag_uid).options(*options)
         result = await session.exec(statement)
         return result.first()
 
     async def add_tag(self, tag_data: TagCreateModel, session: AsyncSession):
-        statement = select(Tag).where(Tag.name == tag_data.name)
-        result = await session.exec(statement)
-        tag = result.first()
-        if tag:
-            raise TagAlreadyExists()
-        new_tag = Tag(name=tag_data.name)
-        session.add(new_tag)
+        # the unique name index decides, so concurrent adds cannot both win
+        statement = (
+            insert(Tag)
+            .values(uid=uuid.uuid4(), name=tag_data.name)
+            .on_conflict_do_nothing(index_elements=[Tag.name])
+            .returning(*[getattr(Tag, field) for field in TAG_FIELDS])
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        new_tag = results.first()
         await session.commit()
-        return new_tag
+        if new_tag is None:
+            raise TagAlreadyExists()
+        return dict(new_tag._mapping)
+
+    async def get_tagged_book_uids(
+        self, tag_uid, session: AsyncSession
+    ) -> List[uuid.UUID]:
+        """The uids of the books carrying a tag, from the tag -> books index"""
+        statement = select(BookTag.book_id).where(BookTag.tag_id == tag_uid)
+        results = await session.exec(statement)
+        return results.all()
 
     async def update_tag(
         self, tag_uid, tag_update_data: TagCreateModel, session: AsyncSession
@@ -61,16 +204,46 @@ class TagService:
         tag = await self.get_tag_by_uid(tag_uid, session)
         if not tag:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        # their cached detail is dropped after the rename
+        tagged_books = await self.get_tagged_book_uids(tag.uid, session)
         update_data_dict = tag_update_data.model_dump()
         for k, v in update_data_dict.items():
             setattr(tag, k, v)
-            await session.commit()
-            await session.refresh(tag)
+        tag.version += 1
+        try:
+            # before touch_books, which would otherwise autoflush the rename
+            await session.flush()
+        except IntegrityError:
+            # renamed to the name of another tag
+            await session.rollback()
+            raise TagAlreadyExists()
+        await book_service.touch_books(session, *tagged_books)
+        await session.commit()
+        await session.refresh(tag)
+        await book_detail_cache.invalidate(*[str(uid) for uid in tagged_books])
         return tag
 
     async def delete_tag(self, tag_uid: str, session: AsyncSession):
-        tag = await self.get_tag_by_uid(tag_uid, session)
-        if not tag:
+        statement = (
+            delete(BookTag)
+            .where(BookTag.tag_id == tag_uid)
+            .returning(BookTag.book_id)
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        tagged_books = results.scalars().all()
+        statement = (
+            delete(Tag)
+            .where(Tag.uid == tag_uid)
+            .returning(Tag.uid)
+            .execution_options(synchronize_session=False)
+        )
+        results = await session.exec(statement)
+        if results.first() is None:
+            await session.rollback()
             raise TagNotFound()
-        await session.delete(tag)
+        await book_service.touch_books(session, *tagged_books)
         await session.commit()
+        await book_detail_cache.invalidate(*[str(uid) for uid in tagged_books])
+        if tagged_books:
+            update_related_books.delay([str(uid) for uid in tagged_books])
@@ -1,10 +1,36 @@
+import re
+import asyncio
 import pytest
+from datetime import date
 from unittest.mock import Mock
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.dialects.sqlite.base import SQLiteCompiler
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.elements import CollationClause
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src import app
+from src.auth import routes as auth_routes
+from src.books import routes as book_routes
+from src.reviews import routes as review_routes
 from src.db.main import get_session
-from src.auth.dependencies import AccessTokenBearer, RoleChecker, RefreshTokenBearer
+from src.db.models import User, Book, Review, Tag
+from src.auth.dependencies import (
+    AccessTokenBearer,
+    RoleChecker,
+    RefreshTokenBearer,
+    get_current_user,
+    get_principal,
+)
+from src.auth.schemas import UserPrincipalModel
+from src.auth.utils import create_access_token, decode_token
 
 
 mock_session = Mock()
@@ -44,3 +70,231 @@ def fake_book_service():
 @pytest.fixture
 def test_client():
     return TestClient(app)
+
+
+@compiles(TSVECTOR, "sqlite")
+def compile_tsvector_for_sqlite(type_, compiler, **kw):
+    return "TEXT"
+
+
+@compiles(CollationClause, "sqlite")
+def compile_collation_for_sqlite(collation, compiler, **kw):
+    # the byte order of the postgres "C" collation is BINARY in sqlite
+    if collation.collation == "C":
+        return "BINARY"
+    return compiler.visit_collation(collation, **kw)
+
+
+def visit_custom_op_binary(self, binary, operator, **kw):
+    # sqlite has no @@, the text search match is a function there
+    if operator.opstring == "@@":
+        left = self.process(binary.left, **kw)
+        right = self.process(binary.right, **kw)
+        return f"ts_match({left}, {right})"
+    return SQLCompiler.visit_custom_op_binary(self, binary, operator, **kw)
+
+
+SQLiteCompiler.visit_custom_op_binary = visit_custom_op_binary
+
+# the default ts_rank weights of postgres
+SEARCH_WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+
+def to_tsvector(config, text):
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+
+def setweight(vector, weight):
+    # "A:word " entries, which still concatenate with ||
+    return "".join(f"{weight}:{word} " for word in vector.split())
+
+
+def tsvector_words(vector):
+    return [entry.split(":", 1) for entry in vector.split()]
+
+
+def ts_match(vector, query):
+    words = {word for _, word in tsvector_words(vector)}
+    return all(word in words for word in query.split())
+
+
+def ts_rank(vector, query):
+    terms = set(query.split())
+    return sum(
+        SEARCH_WEIGHTS[weight]
+        for weight, word in tsvector_words(vector)
+        if word in terms
+    )
+
+
+def configure_sqlite(dbapi_connection, connection_record):
+    """Enforce foreign keys and stand in for the postgres functions we use"""
+    dbapi_connection.execute("PRAGMA foreign_keys=ON")
+    for name, arity, function in [
+        ("to_tsvector", 2, to_tsvector),
+        ("setweight", 2, setweight),
+        ("websearch_to_tsquery", 2, lambda config, text: to_tsvector(config, text)),
+        ("ts_match", 2, ts_match),
+        ("ts_rank", 2, ts_rank),
+        ("set_config", 3, lambda name, value, is_local: value),
+    ]:
+        dbapi_connection.create_function(name, arity, function, deterministic=True)
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    event.listen(engine.sync_engine, "connect", configure_sqlite)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    return engine
+
+
+@pytest.fixture
+def db_session_maker(db_engine):
+    return sessionmaker(bind=db_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture
+def query_counter(db_engine):
+    """Records every SQL statement sent to the test database"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count)
+    yield statements
+    event.remove(db_engine.sync_engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def seeded_db(db_session_maker):
+    """A verified user owning one book with a tag, reviewed by them and a critic"""
+
+    async def seed():
+        async with db_session_maker() as session:
+            user = User(
+                username="reader",
+                email="reader@mail.com",
+                first_name="jasder",
+                last_name="both",
+                role="user",
+                is_verufied=True,
+                password_hash="x",
+            )
+            book = Book(
+                title="Think Python",
+                author="Allen B. Downey",
+                publisher="O'Reilly Media",
+                published_date=date(2021, 1, 1),
+                page_count=1234,
+                language="English",
+                user=user,
+                tags=[Tag(name="python")],
+            )
+            session.add_all(
+                [
+                    book,
+                    Review(rating=4, review_text="great", user=user, book=book),
+                    Review(
+                        rating=3,
+                        review_text="good",
+                        user=User(
+                            username="critic",
+                            email="critic@mail.com",
+                            first_name="ada",
+                            last_name="critic",
+                            role="user",
+                            is_verufied=True,
+                            password_hash="x",
+                        ),
+                        book=book,
+                    ),
+                ]
+            )
+            await session.commit()
+            return user, book
+
+    user, book = asyncio.run(seed())
+    return {"user": user, "book": book}
+
+
+@pytest.fixture
+def token_client(db_session_maker, seeded_db, monkeypatch):
+    """
+    Client sending a real access token of the seeded user, with the redis
+    blocklist answered in-process. Records the decodes and blocklist lookups.
+    """
+    user = seeded_db["user"]
+    token = create_access_token({"email": user.email, "user_uid": str(user.uid)})
+    calls = {"decoded": [], "checked": []}
+
+    def counting_decode(token):
+        calls["decoded"].append(token)
+        return decode_token(token)
+
+    async def token_in_blocklist(jti):
+        calls["checked"].append(jti)
+        return False
+
+    async def get_db_session():
+        async with db_session_maker() as session:
+            yield session
+
+    monkeypatch.setattr("src.auth.dependencies.decode_token", counting_decode)
+    monkeypatch.setattr("src.auth.dependencies.token_in_blocklist", token_in_blocklist)
+    monkeypatch.setitem(app.dependency_overrides, get_session, get_db_session)
+    # one event loop for all requests, like a worker, so the caches keep
+    # their invalidation subscriber
+    with TestClient(
+        app,
+        base_url="http://localhost",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as client:
+        yield client, calls
+
+
+@pytest.fixture
+def related_updates(monkeypatch):
+    """Records the related book updates queued instead of sending them to celery"""
+    task = Mock()
+    monkeypatch.setattr("src.tags.service.update_related_books", task)
+    return task.delay
+
+
+@pytest.fixture
+def db_client(db_session_maker, seeded_db, related_updates):
+    """Test client talking to the seeded database as an authenticated user"""
+    user = seeded_db["user"]
+
+    async def get_db_session():
+        async with db_session_maker() as session:
+            yield session
+
+    def token_details():
+        return {"user": {"email": user.email, "user_uid": str(user.uid)}}
+
+    overrides = {
+        get_session: get_db_session,
+        get_current_user: lambda: user,
+        get_principal: lambda: UserPrincipalModel.model_validate(
+            user, from_attributes=True
+        ),
+        auth_routes.access_token_bearer: token_details,
+        book_routes.access_token_bearer: token_details,
+        review_routes.access_token_bearer: token_details,
+    }
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides.update(overrides)
+    yield TestClient(app, base_url="http://localhost")
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
@@ -1,4 +1,8 @@
+import asyncio
+
 from src.auth.schemas import UserCreateModel
+from src.auth.service import UserService
+from src.db.models import User
 
 auth_prefix = f"/api/v1/auth"
 
@@ -22,3 +26,68 @@ def test_user_creation(fake_session, fake_user_service, test_client):
 
     assert fake_user_service.create_user_called_once()
     assert fake_user_service.create_user_called_once_with(user_data, fake_session)
+
+
+def test_token_is_checked_once_per_request(token_client, seeded_db):
+    client, calls = token_client
+
+    # a role checker and a bearer of its own, like most book routes
+    response = client.get(url=f"/api/v1/books/{seeded_db['book'].uid}/related")
+
+    assert response.status_code == 200
+    assert (len(calls["decoded"]), len(calls["checked"])) == (1, 1)
+
+
+def test_principal_is_cached_until_the_user_changes(
+    token_client, db_session_maker, seeded_db, query_counter
+):
+    client, _ = token_client
+    url = f"/api/v1/books/{seeded_db['book'].uid}/related"
+
+    client.get(url=url)
+    first = len(query_counter)
+    # without redis the invalidation subscriber fails, and the local clear
+    # that follows can void the fill of the first request
+    client.get(url=url)
+    before = len(query_counter)
+    client.get(url=url)
+
+    # a cached principal authorizes without loading the user
+    assert len(query_counter) - before == first - 1
+
+    async def demote():
+        async with db_session_maker() as session:
+            user = await session.get(User, seeded_db["user"].uid)
+            await UserService().update_user(user, {"role": "guest"}, session)
+
+    asyncio.run(demote())
+    response = client.get(url=url)
+    assert response.status_code == 401
+    assert response.json()["error_code"] == "insufficient_permissions"
+
+
+def test_principal_changed_during_its_load_is_not_cached(
+    token_client, db_session_maker, seeded_db, monkeypatch
+):
+    client, _ = token_client
+    url = f"/api/v1/books/{seeded_db['book'].uid}/related"
+    user_service = UserService()
+    changes = [{"is_verufied": False}]
+
+    async def get_principal(user_uid, session):
+        principal = await user_service.get_principal(user_uid, session)
+        if changes:
+            # the user is unverified right after their principal was read
+            async with db_session_maker() as other_session:
+                user = await other_session.get(User, user_uid)
+                await user_service.update_user(user, changes.pop(), other_session)
+        return principal
+
+    monkeypatch.setattr(
+        "src.auth.dependencies.user_service.get_principal", get_principal
+    )
+
+    assert client.get(url=url).status_code == 200
+    response = client.get(url=url)
+    assert response.status_code == 403
+    assert response.json()["error_code"] == "account_not_verified"
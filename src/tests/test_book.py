@@ -1,3 +1,17 @@
+import uuid
+import asyncio
+import pytest
+from datetime import date
+from sqlmodel import select
+
+from src import app
+from src.auth.dependencies import get_principal
+from src.auth.schemas import UserPrincipalModel
+from src.books.schemas import BookProjectionPageModel
+from src.books.service import BookService, parse_fields
+from src.db.models import Book, BookTag, Review
+from src.errors import InvalidFieldSelection
+
 books_prefix = f"/api/v1/books"
 
 
@@ -6,3 +20,313 @@ def test_get_all_books(test_client, fake_book_service, fake_session):
 
     assert fake_book_service.get_all_books_called_once()
     assert fake_book_service.get_all_books_called_once_with(fake_session)
+
+
+def test_parse_fields_keeps_requested_order():
+    assert parse_fields("title, author,title") == ["title", "author"]
+    assert parse_fields(None) is None
+
+
+@pytest.mark.parametrize("fields", ["", "title,password_hash", "reviews"])
+def test_parse_fields_rejects_unknown_fields(fields):
+    with pytest.raises(InvalidFieldSelection):
+        parse_fields(fields)
+
+
+def test_projected_list_matches_the_documented_schema(db_client):
+    response = db_client.get(url=f"{books_prefix}", params={"fields": "title"})
+
+    BookProjectionPageModel.model_validate(response.json())
+    schema = app.openapi()["paths"][f"{books_prefix}"]["get"]["responses"]["200"]
+    refs = schema["content"]["application/json"]["schema"]["anyOf"]
+    assert {"$ref": "#/components/schemas/BookProjectionPageModel"} in refs
+
+
+def test_export_books_streams_csv(db_client, db_session_maker, seeded_db, monkeypatch):
+    monkeypatch.setattr("src.db.export.async_session", db_session_maker)
+    monkeypatch.setattr("src.db.export.EXPORT_BATCH_SIZE", 1)
+    url = f"{books_prefix}/export"
+
+    # exports are for admins only
+    assert db_client.get(url=url).status_code == 401
+    admin = UserPrincipalModel.model_validate(seeded_db["user"], from_attributes=True)
+    admin.role = "admin"
+    monkeypatch.setitem(app.dependency_overrides, get_principal, lambda: admin)
+
+    response = db_client.get(url=url, params={"format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    header, row = response.text.splitlines()
+    assert header.startswith("uid,title,author,publisher")
+    assert "Think Python" in row
+
+
+def test_book_list_etag_changes_with_book_version(db_client):
+    etag = db_client.get(url=f"{books_prefix}").headers["ETag"]
+
+    unchanged = db_client.get(url=f"{books_prefix}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    book_uid = db_client.get(url=f"{books_prefix}").json()["items"][0]["uid"]
+    db_client.post(
+        url=f"/api/v1/reviews/book/{book_uid}",
+        json={"rating": 3, "review_text": "changed my mind"},
+    )
+
+    changed = db_client.get(url=f"{books_prefix}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_bulk_delete_cascades_and_reports_missing(db_session_maker, seeded_db):
+    book_uid = seeded_db["book"].uid
+    unknown_uid = uuid.uuid4()
+
+    async def run():
+        async with db_session_maker() as session:
+            result = await BookService().delete_books(
+                [book_uid, unknown_uid, book_uid], session
+            )
+            reviews = (await session.exec(select(Review))).all()
+            links = (await session.exec(select(BookTag))).all()
+            return result, reviews, links
+
+    result, reviews, links = asyncio.run(run())
+
+    assert result == {"deleted": [book_uid], "missing": [unknown_uid]}
+    assert reviews == []
+    assert links == []
+
+
+def test_repair_recomputes_rating_aggregates(db_session_maker, seeded_db):
+    # the seed inserts reviews directly, so the aggregates start out stale
+    async def run():
+        async with db_session_maker() as session:
+            repaired = await BookService().repair_rating_aggregates(session)
+            again = await BookService().repair_rating_aggregates(session)
+            book = await BookService().get_book(seeded_db["book"].uid, session)
+            return repaired, again, book
+
+    repaired, again, book = asyncio.run(run())
+
+    assert (repaired, again) == (1, 0)
+    assert (book.review_count, book.rating_sum) == (2, 7)
+    assert book.average_rating == 3.5
+    assert book.rating_histogram == [0, 0, 0, 1, 1]
+
+
+def test_repair_goes_through_books_in_batches(db_session_maker, seeded_db, monkeypatch):
+    monkeypatch.setattr("src.books.service.REPAIR_BATCH_SIZE", 1)
+    book = seeded_db["book"]
+
+    async def run():
+        async with db_session_maker() as session:
+            other = Book(
+                title="Fluent Python",
+                author="Luciano Ramalho",
+                publisher=book.publisher,
+                published_date=book.published_date,
+                page_count=792,
+                language="English",
+                user_uid=book.user_uid,
+                rating_sum=5,
+            )
+            session.add(other)
+            await session.commit()
+            repaired = await BookService().repair_rating_aggregates(session)
+            await session.refresh(other)
+            return repaired, other.rating_sum
+
+    # the seeded book's stale aggregates and the other's made up rating sum
+    assert asyncio.run(run()) == (2, 0)
+
+
+def test_reviews_maintain_rating_aggregates(db_client, db_session_maker, seeded_db):
+    async def repair():
+        async with db_session_maker() as session:
+            await BookService().repair_rating_aggregates(session)
+
+    asyncio.run(repair())
+    book_url = f"{books_prefix}/{seeded_db['book'].uid}"
+    # replaces the 4 the user gave in the seed
+    review = db_client.post(
+        url=f"/api/v1/reviews/book/{seeded_db['book'].uid}",
+        json={"rating": 2, "review_text": "not for me"},
+    ).json()
+
+    book = db_client.get(url=book_url).json()
+    assert (book["review_count"], book["rating_sum"]) == (2, 5)
+    assert book["rating_histogram"] == [0, 0, 1, 1, 0]
+    assert len(book["reviews"]) == 2
+
+    db_client.delete(url=f"/api/v1/reviews/{review['uid']}")
+
+    book = db_client.get(url=book_url).json()
+    assert (book["review_count"], book["rating_sum"]) == (1, 3)
+    assert book["average_rating"] == 3
+
+
+def test_review_of_unknown_book(db_client):
+    response = db_client.post(
+        url=f"/api/v1/reviews/book/{uuid.uuid4()}",
+        json={"rating": 2, "review_text": "not for me"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_list_books_sorted_by_review_count(db_client, db_session_maker, seeded_db):
+    async def seed():
+        async with db_session_maker() as session:
+            books = [
+                Book(
+                    title=title,
+                    author="someone",
+                    publisher="someone",
+                    published_date=date(2020, 1, 1),
+                    page_count=100,
+                    language="English",
+                )
+                for title in ["Fluent Python", "Python Tricks"]
+            ]
+            session.add_all(books)
+            await session.commit()
+            return books[1].uid
+
+    tricks_uid = asyncio.run(seed())
+    db_client.post(
+        url=f"/api/v1/reviews/book/{tricks_uid}",
+        json={"rating": 4, "review_text": "neat"},
+    )
+
+    first = db_client.get(
+        url=f"{books_prefix}", params={"sort": "review_count", "limit": 1}
+    ).json()
+    rest = db_client.get(
+        url=f"{books_prefix}",
+        params={"sort": "review_count", "cursor": first["next_cursor"]},
+    ).json()
+
+    assert [book["title"] for book in first["items"]] == ["Python Tricks"]
+    assert len(rest["items"]) == 2
+    assert rest["next_cursor"] is None
+
+
+def test_list_books_filters(db_client, seeded_db):
+    def titles(**params):
+        response = db_client.get(url=f"{books_prefix}", params=params)
+        assert response.status_code == 200
+        return [book["title"] for book in response.json()["items"]]
+
+    assert titles(language="English", tag="python") == ["Think Python"]
+    assert titles(published_from="2021-01-01", max_pages=2000) == ["Think Python"]
+    assert titles(language="French") == []
+    assert titles(tag="rust") == []
+
+
+def test_book_facets_ignore_their_own_filter(db_client, seeded_db):
+    response = db_client.get(
+        url=f"{books_prefix}/facets", params={"language": "French"}
+    )
+
+    facets = response.json()
+    assert response.status_code == 200
+    assert facets["language"] == [{"value": "English", "count": 1}]
+    assert facets["publisher"] == []
+    assert facets["tag"] == []
+
+    facets = db_client.get(url=f"{books_prefix}/facets").json()
+    assert facets["published_year"] == [{"value": "2021", "count": 1}]
+    assert facets["page_count"] == [{"value": "500+", "count": 1}]
+    assert facets["tag"] == [{"value": "python", "count": 1}]
+
+
+def test_autocomplete_matches_prefixes_ignoring_case(db_client, seeded_db):
+    response = db_client.get(
+        url=f"{books_prefix}/autocomplete", params={"prefix": "ThI"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {"kind": "title", "value": "Think Python", "uid": str(seeded_db["book"].uid)}
+    ]
+
+    suggestions = db_client.get(
+        url=f"{books_prefix}/autocomplete", params={"prefix": "allen"}
+    ).json()
+    assert suggestions == [{"kind": "author", "value": "Allen B. Downey", "uid": None}]
+
+    suggestions = db_client.get(
+        url=f"{books_prefix}/autocomplete", params={"prefix": "py"}
+    ).json()
+    assert [(s["kind"], s["value"]) for s in suggestions] == [("tag", "python")]
+
+
+def test_autocomplete_escapes_like_wildcards(db_client, seeded_db):
+    response = db_client.get(url=f"{books_prefix}/autocomplete", params={"prefix": "%"})
+
+    assert response.json() == []
+
+
+def add_books(db_session_maker, seeded_db, *books):
+    """Books of the seeded user from (title, author, publisher)"""
+
+    async def add():
+        async with db_session_maker() as session:
+            session.add_all(
+                Book(
+                    title=title,
+                    author=author,
+                    publisher=publisher,
+                    published_date=date(2020, 1, 1),
+                    page_count=100,
+                    language="English",
+                    user_uid=seeded_db["user"].uid,
+                )
+                for title, author, publisher in books
+            )
+            await session.commit()
+
+    asyncio.run(add())
+
+
+def test_search_ranks_title_matches_above_author_and_publisher(
+    db_client, db_session_maker, seeded_db
+):
+    add_books(
+        db_session_maker,
+        seeded_db,
+        ("Holy Grail", "Monty Python", "Methuen"),
+        ("Snakes", "Ann Jones", "Python Press"),
+        ("Salt Fat Acid Heat", "Samin Nosrat", "Simon & Schuster"),
+    )
+    url = f"{books_prefix}/search"
+
+    first = db_client.get(url=url, params={"q": "python", "limit": 2}).json()
+    second = db_client.get(
+        url=url, params={"q": "python", "limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+
+    # title, then author, then publisher matches, books without one left out
+    assert [book["title"] for book in first["items"]] == ["Think Python", "Holy Grail"]
+    assert [book["title"] for book in second["items"]] == ["Snakes"]
+    assert second["next_cursor"] is None
+
+
+def test_search_matches_every_word_of_the_query(db_client, db_session_maker, seeded_db):
+    add_books(db_session_maker, seeded_db, ("Fluent Python", "Luciano Ramalho", "x"))
+
+    response = db_client.get(
+        url=f"{books_prefix}/search", params={"q": "Python Downey"}
+    )
+
+    assert [book["title"] for book in response.json()["items"]] == ["Think Python"]
+
+
+@pytest.mark.parametrize("params", [{}, {"q": ""}])
+def test_search_requires_a_query(db_client, query_counter, params):
+    response = db_client.get(url=f"{books_prefix}/search", params=params)
+
+    assert response.status_code == 422
+    assert len(query_counter) == 0
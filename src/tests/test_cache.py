@@ -0,0 +1,38 @@
+import asyncio
+
+from src.db.cache import LRUCache, TwoTierCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 1, "evictions": 1}
+
+
+def test_lru_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=-1)
+    cache.set("a", "1")
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_fill_is_not_stored_after_an_invalidation():
+    cache = TwoTierCache("test", maxsize=2, ttl=60, redis_ttl=60)
+
+    async def fill(key, invalidated):
+        generation = await cache.generation(key)
+        if invalidated:
+            # a write committed while the value was loaded
+            await cache.invalidate(key)
+        await cache.set(key, "loaded", generation)
+        return cache.local.get(key)
+
+    assert asyncio.run(fill("a", invalidated=False)) == "loaded"
+    assert asyncio.run(fill("b", invalidated=True)) is None
@@ -0,0 +1,102 @@
+import asyncio
+from sqlmodel import select
+
+from src.db.models import Book, Tag
+from src.gql.limits import RELATION_LIST_SIZE
+
+graphql_url = "/api/v1/graphql"
+
+
+def test_graphql_batches_each_relation_per_level(db_client, seeded_db, query_counter):
+    query = """
+    {
+      books(limit: 10) {
+        title
+        tags { name }
+        reviews { rating user { username books { title } } }
+      }
+    }
+    """
+    response = db_client.post(url=graphql_url, json={"query": query})
+
+    book = response.json()["data"]["books"][0]
+    assert response.status_code == 200
+    assert book["title"] == "Think Python"
+    assert book["tags"] == [{"name": "python"}]
+    assert len(book["reviews"]) == 2
+    assert {review["user"]["username"] for review in book["reviews"]} == {
+        "reader",
+        "critic",
+    }
+    # books, tags, reviews, users and the users' books: one query each
+    assert len(query_counter) == 5
+
+
+def test_graphql_book_by_uid(db_client, seeded_db):
+    query = "query ($uid: UUID!) { book(uid: $uid) { title user { username } } }"
+    response = db_client.post(
+        url=graphql_url,
+        json={"query": query, "variables": {"uid": str(seeded_db["book"].uid)}},
+    )
+
+    assert response.json() == {
+        "data": {"book": {"title": "Think Python", "user": {"username": "reader"}}}
+    }
+
+
+def test_graphql_rejects_deep_queries(db_client, query_counter):
+    query = """
+    { books { reviews { book { reviews { book { reviews { rating } } } } } } }
+    """
+    response = db_client.post(url=graphql_url, json={"query": query})
+
+    assert response.status_code == 400
+    assert "depth" in response.json()["errors"][0]["message"]
+    assert len(query_counter) == 0
+
+
+def test_graphql_rejects_costly_queries(db_client):
+    query = "{ books(limit: 100) { reviews { user { books { title } } } } }"
+    response = db_client.post(url=graphql_url, json={"query": query})
+
+    assert response.status_code == 400
+    assert "cost" in response.json()["errors"][0]["message"]
+
+
+def test_graphql_relation_lists_are_capped(db_client, db_session_maker, seeded_db):
+    book = seeded_db["book"]
+
+    async def seed():
+        async with db_session_maker() as session:
+            tag = (await session.exec(select(Tag).where(Tag.name == "python"))).one()
+            session.add_all(
+                Book(
+                    title=f"Python {i}",
+                    author=book.author,
+                    publisher=book.publisher,
+                    published_date=book.published_date,
+                    page_count=100,
+                    language="English",
+                    user_uid=book.user_uid,
+                    tags=[tag],
+                )
+                for i in range(RELATION_LIST_SIZE + 5)
+            )
+            await session.commit()
+
+    asyncio.run(seed())
+    query = "{ tags { name books { title } } }"
+    response = db_client.post(url=graphql_url, json={"query": query})
+
+    (tag,) = response.json()["data"]["tags"]
+    assert len(tag["books"]) == RELATION_LIST_SIZE
+    # the newest books of the tag, the first one seeded is cut
+    assert "Think Python" not in {book["title"] for book in tag["books"]}
+
+
+def test_graphql_is_read_only(db_client):
+    query = 'mutation { deleteBook(uid: "x") }'
+    response = db_client.post(url=graphql_url, json={"query": query})
+
+    assert response.json()["errors"]
+    assert response.json().get("data") is None
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from sqlalchemy import text
+from sqlmodel import select
+
+from src.books.book_data import books
+from src.books.importer import iter_rows
+from src.books.service import BookService
+from src.db.models import Book
+
+book_service = BookService()
+
+
+async def stream(body: bytes, chunk_size: int = 7):
+    for start in range(0, len(body), chunk_size):
+        yield body[start : start + chunk_size]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+def import_body(db_session_maker, media_type, body, user_uid):
+    async def run():
+        async with db_session_maker() as session:
+            rows = iter_rows(media_type, stream(body))
+            report = await book_service.import_books(rows, user_uid, session)
+            titles = (await session.exec(select(Book.title))).all()
+            return report, titles
+
+    return asyncio.run(run())
+
+
+def test_csv_rows_survive_chunk_boundaries_and_quoted_newlines():
+    body = (
+        "title,author,publisher,published_date,page_count,language\r\n"
+        '"Think, Python","Allen ""B"" Downey","O\'Reilly\nMedia",2021-01-01,12,en\r\n'
+    ).encode()
+
+    rows = asyncio.run(collect(iter_rows("text/csv; charset=utf-8", stream(body))))
+
+    assert rows == [
+        (
+            1,
+            {
+                "title": "Think, Python",
+                "author": 'Allen "B" Downey',
+                "publisher": "O'Reilly\nMedia",
+                "published_date": "2021-01-01",
+                "page_count": "12",
+                "language": "en",
+            },
+        )
+    ]
+
+
+def test_csv_quote_inside_an_unquoted_value_is_literal():
+    body = (
+        "title,author,publisher,published_date,page_count,language\n"
+        '5" Floppy Guide,someone,someone,1985-01-01,12,en\n'
+        "Think Python,Allen B. Downey,O'Reilly Media,2021-01-01,12,en\n"
+    ).encode()
+
+    rows = asyncio.run(collect(iter_rows("text/csv", stream(body))))
+
+    assert [(number, row["title"]) for number, row in rows] == [
+        (1, '5" Floppy Guide'),
+        (2, "Think Python"),
+    ]
+
+
+def test_csv_unterminated_quoted_value_is_reported():
+    body = (
+        "title,author,publisher,published_date,page_count,language\n"
+        "\"Think Python,Allen B. Downey,O'Reilly Media,2021-01-01,12,en\n"
+        "Fluent Python,Luciano Ramalho,O'Reilly Media,2022-01-01,12,en\n"
+    ).encode()
+
+    rows = asyncio.run(collect(iter_rows("text/csv", stream(body))))
+
+    assert [(number, str(row)) for number, row in rows] == [
+        (1, "unterminated quoted value")
+    ]
+
+
+def test_import_inserts_valid_rows_and_reports_the_rest(db_session_maker, seeded_db):
+    lines = [json.dumps(book) for book in books[:3]]
+    lines.insert(1, "{not json")
+    lines.append(json.dumps({**books[3], "published_date": "yesterday"}))
+    lines.append(json.dumps({**books[4], "page_count": "many"}))
+    body = "\n".join(lines).encode()
+
+    report, titles = import_body(
+        db_session_maker, "application/x-ndjson", body, seeded_db["user"].uid
+    )
+
+    assert report["inserted"] == 3
+    assert report["failed"] == 3
+    assert [error["row"] for error in report["errors"]] == [2, 5, 6]
+    assert report["errors"][2]["errors"][0]["field"] == "page_count"
+    assert {book["title"] for book in books[:3]} <= set(titles)
+
+
+def test_rows_the_database_refuses_are_reported(db_engine, db_session_maker, seeded_db):
+    async def reject_title(title):
+        # stands in for a postgres refusal, like a page count beyond int4
+        async with db_engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "CREATE TRIGGER reject_title BEFORE INSERT ON books "
+                    f"WHEN NEW.title = '{title}' "
+                    "BEGIN SELECT RAISE(ABORT, 'title refused'); END"
+                )
+            )
+
+    asyncio.run(reject_title(books[1]["title"]))
+    body = "\n".join(json.dumps(book) for book in books[:3]).encode()
+
+    report, titles = import_body(
+        db_session_maker, "application/x-ndjson", body, seeded_db["user"].uid
+    )
+
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["row"] == 2
+    assert "title refused" in report["errors"][0]["errors"][0]["message"]
+    assert {books[0]["title"], books[2]["title"]} <= set(titles)
+    assert books[1]["title"] not in titles
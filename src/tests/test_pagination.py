@@ -0,0 +1,37 @@
+import uuid
+import base64
+import pytest
+from datetime import datetime
+
+from src.db.pagination import encode_cursor, decode_cursor
+from src.errors import InvalidCursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 20, 21, 40, 23, 168620)
+    uid = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, uid)
+
+    assert decode_cursor(cursor, datetime.fromisoformat, uuid.UUID) == [
+        created_at,
+        uid,
+    ]
+
+
+def test_missing_cursor_is_first_page():
+    assert decode_cursor(None, datetime.fromisoformat, uuid.UUID) is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        encode_cursor("2025-01-01"),
+        # crafted, the uid is not a string
+        base64.urlsafe_b64encode(b'["2024-01-01",1]').decode(),
+    ],
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
@@ -0,0 +1,159 @@
+"""Guards on how many SQL statements each endpoint sends to the database"""
+
+books_prefix = "/api/v1/books"
+
+
+def test_list_books_runs_one_query(db_client, query_counter):
+    response = db_client.get(url=f"{books_prefix}")
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+    assert len(query_counter) == 1
+
+
+def test_book_detail_loads_reviews_and_tags_in_one_query_each(
+    db_client, seeded_db, query_counter
+):
+    response = db_client.get(url=f"{books_prefix}/{seeded_db['book'].uid}")
+
+    assert response.status_code == 200
+    assert len(response.json()["reviews"]) == 2
+    assert len(response.json()["tags"]) == 1
+    assert len(query_counter) == 3
+
+
+def test_book_detail_with_fields_skips_relations(db_client, seeded_db, query_counter):
+    response = db_client.get(
+        url=f"{books_prefix}/{seeded_db['book'].uid}", params={"fields": "title"}
+    )
+
+    assert response.json() == {"title": "Think Python"}
+    assert len(query_counter) == 1
+
+
+def test_list_tags_does_not_load_books(db_client, query_counter):
+    response = db_client.get(url="/api/v1/tags")
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["book_count"] == 1
+    assert len(query_counter) == 1
+
+
+def test_profile_loads_books_and_reviews(db_client, query_counter):
+    response = db_client.get(url="/api/v1/auth/me")
+
+    assert response.status_code == 200
+    assert len(response.json()["books"]) == 1
+    assert len(response.json()["reviews"]) == 1
+    assert len(query_counter) == 3
+
+
+def test_review_creation_statements(db_client, seeded_db, query_counter):
+    response = db_client.post(
+        url=f"/api/v1/reviews/book/{seeded_db['book'].uid}",
+        json={"rating": 4, "review_text": "again"},
+    )
+
+    assert response.status_code == 200
+    # book lock, the user's previous rating, the rating aggregates of the
+    # book, then the review upsert
+    assert len(query_counter) == 4
+    assert query_counter[0].startswith("SELECT books.uid")
+
+
+def test_review_creation_with_a_real_token(token_client, seeded_db, query_counter):
+    client, _ = token_client
+    url = f"/api/v1/reviews/book/{seeded_db['book'].uid}"
+    # warm the principal cache behind the role check
+    client.post(url=url, json={"rating": 3, "review_text": "first"})
+    query_counter.clear()
+
+    response = client.post(url=url, json={"rating": 4, "review_text": "again"})
+
+    assert response.status_code == 200
+    # only the review statements; the reviewer comes from the token and is
+    # not looked up again by email
+    assert len(query_counter) == 4
+    assert not any("users.email" in statement for statement in query_counter)
+
+
+def test_review_deletion_locks_the_book_first(db_client, seeded_db, query_counter):
+    review = db_client.post(
+        url=f"/api/v1/reviews/book/{seeded_db['book'].uid}",
+        json={"rating": 2, "review_text": "not for me"},
+    ).json()
+    query_counter.clear()
+
+    response = db_client.delete(url=f"/api/v1/reviews/{review['uid']}")
+
+    assert response.status_code == 204
+    writes = [
+        statement.split()[0]
+        for statement in query_counter
+        if statement.startswith(("SELECT books.uid", "DELETE", "UPDATE"))
+    ]
+    # same lock order as the review upsert: the book row, then the review
+    assert writes == ["SELECT", "DELETE", "UPDATE"]
+
+
+def test_book_revalidation_only_reads_the_version(db_client, seeded_db, query_counter):
+    url = f"{books_prefix}/{seeded_db['book'].uid}"
+    etag = db_client.get(url=url).headers["ETag"]
+    query_counter.clear()
+
+    response = db_client.get(url=url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert len(query_counter) == 1
+
+
+def test_book_update_is_one_conditional_statement(db_client, seeded_db, query_counter):
+    url = f"{books_prefix}/{seeded_db['book'].uid}"
+    book_update = {
+        "title": "Think Python 2e",
+        "author": "Allen B. Downey",
+        "publisher": "O'Reilly Media",
+        "page_count": 300,
+        "language": "English",
+    }
+    etag = f'"{seeded_db["book"].uid}-{seeded_db["book"].version}"'
+    query_counter.clear()
+
+    response = db_client.patch(url=url, json=book_update, headers={"If-Match": etag})
+
+    assert response.status_code == 200
+    assert response.json()["version"] == seeded_db["book"].version + 1
+    assert len(query_counter) == 1
+
+    stale = db_client.patch(url=url, json=book_update, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+
+def test_book_batch_loads_each_relation_once(db_client, seeded_db, query_counter):
+    book_uid = str(seeded_db["book"].uid)
+    unknown_uid = "00000000-0000-0000-0000-000000000000"
+
+    response = db_client.post(
+        url=f"{books_prefix}/batch",
+        json={"uids": [unknown_uid, book_uid], "include": ["reviews", "tags"]},
+    )
+
+    items = response.json()["items"]
+    assert response.status_code == 200
+    assert items[0] is None
+    assert items[1]["uid"] == book_uid
+    assert (len(items[1]["reviews"]), len(items[1]["tags"])) == (2, 1)
+    assert response.json()["missing"] == [unknown_uid]
+    assert len(query_counter) == 3
+
+
+def test_book_batch_without_relations_runs_one_query(
+    db_client, seeded_db, query_counter
+):
+    response = db_client.post(
+        url=f"{books_prefix}/batch", json={"uids": [str(seeded_db["book"].uid)]}
+    )
+
+    assert response.json()["items"][0]["reviews"] is None
+    assert len(query_counter) == 1
@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+
+from sqlalchemy import insert
+from sqlmodel import select
+
+from src.books.related import TagMatrix
+from src.books.service import BookService
+from src.db.models import Book, BookTag, RelatedBook, Tag
+
+books_prefix = "/api/v1/books"
+
+
+def test_tag_matrix_ranks_by_jaccard_similarity():
+    a, b, c, d = [uuid.uuid4() for _ in range(4)]
+    x, y, z = [uuid.uuid4() for _ in range(3)]
+    matrix = TagMatrix([(a, x), (a, y), (b, x), (b, y), (c, x), (c, z), (d, z)])
+
+    assert matrix.related(a) == [(b, 1.0), (c, 1 / 3)]
+    assert matrix.related(a, limit=1) == [(b, 1.0)]
+    assert matrix.related(d) == [(c, 0.5)]
+    assert matrix.related(uuid.uuid4()) == []
+
+
+def add_tagged_book(db_session_maker, seeded_db, *tag_names):
+    """A second book of the seeded user, returns its uid"""
+
+    async def add():
+        async with db_session_maker() as session:
+            book = Book(
+                title="Fluent Python",
+                author="Luciano Ramalho",
+                publisher="O'Reilly Media",
+                published_date=seeded_db["book"].published_date,
+                page_count=792,
+                language="English",
+                user_uid=seeded_db["user"].uid,
+                tags=[Tag(name=name) for name in tag_names],
+            )
+            session.add(book)
+            await session.commit()
+            return book.uid
+
+    return asyncio.run(add())
+
+
+def test_rebuild_serves_related_books(db_client, db_session_maker, seeded_db):
+    book_uid = seeded_db["book"].uid
+    other_uid = add_tagged_book(db_session_maker, seeded_db, "programming")
+
+    async def rebuild():
+        async with db_session_maker() as session:
+            # share the seeded "python" tag
+            results = await session.exec(select(Tag.uid).where(Tag.name == "python"))
+            tag_uid = results.first()
+            await session.exec(
+                insert(BookTag).values(book_id=other_uid, tag_id=tag_uid)
+            )
+            await session.commit()
+            return await BookService().rebuild_related_books(session)
+
+    assert asyncio.run(rebuild()) == 2
+    related = db_client.get(url=f"{books_prefix}/{book_uid}/related").json()
+
+    assert [(item["book"]["uid"], item["score"]) for item in related] == [
+        (str(other_uid), 0.5)
+    ]
+
+
+def test_related_books_of_unknown_book(db_client):
+    response = db_client.get(url=f"{books_prefix}/{uuid.uuid4()}/related")
+
+    assert response.status_code == 404
+
+
+def test_tagging_updates_related_books(
+    db_client, db_session_maker, seeded_db, related_updates
+):
+    book_uid = seeded_db["book"].uid
+    other_uid = add_tagged_book(db_session_maker, seeded_db)
+
+    response = db_client.post(
+        url=f"/api/v1/tags/book/{other_uid}/tags", json={"tags": [{"name": "python"}]}
+    )
+    assert response.status_code == 200
+    related_updates.assert_called_once_with([str(other_uid)])
+
+    async def update():
+        async with db_session_maker() as session:
+            return await BookService().update_related_books(session, [other_uid])
+
+    # the changed book's own entry and its entry in the seeded book's list
+    assert asyncio.run(update()) == 2
+    related = db_client.get(url=f"{books_prefix}/{book_uid}/related").json()
+    assert [(item["book"]["uid"], item["score"]) for item in related] == [
+        (str(other_uid), 1.0)
+    ]
+
+
+def test_update_overlapping_another_one_rewrites_its_rows(
+    db_session_maker, seeded_db, monkeypatch
+):
+    book_uid = seeded_db["book"].uid
+    other_uid = add_tagged_book(db_session_maker, seeded_db)
+    insert_related = BookService._insert_related
+
+    async def overlapping(self, rows, session):
+        # another update wrote the same pairs after this one deleted them
+        await session.exec(
+            insert(RelatedBook), params=[{**row, "score": 0.0} for row in rows]
+        )
+        await insert_related(self, rows, session)
+
+    monkeypatch.setattr(BookService, "_insert_related", overlapping)
+
+    async def update():
+        async with db_session_maker() as session:
+            results = await session.exec(select(Tag.uid).where(Tag.name == "python"))
+            await session.exec(
+                insert(BookTag).values(book_id=other_uid, tag_id=results.one())
+            )
+            await BookService().update_related_books(session, [other_uid])
+            results = await session.exec(
+                select(RelatedBook.book_uid, RelatedBook.score)
+            )
+            return sorted(results.all())
+
+    assert asyncio.run(update()) == sorted([(book_uid, 1.0), (other_uid, 1.0)])
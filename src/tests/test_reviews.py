@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import date, datetime
+
+from sqlmodel import select
+
+from src.db.models import Book, Review, User
+from src.reviews.recommendations import RatingMatrixBuilder
+from src.reviews.schemas import ReviewFilterModel
+from src.reviews.service import ReviewService
+
+reviews_prefix = "/api/v1/reviews"
+
+
+def test_book_reviews_page_by_rating(db_client, seeded_db):
+    url = f"{reviews_prefix}/book/{seeded_db['book'].uid}"
+
+    first = db_client.get(url=url, params={"sort": "rating", "limit": 1}).json()
+    second = db_client.get(
+        url=url, params={"sort": "rating", "cursor": first["next_cursor"]}
+    ).json()
+
+    assert [review["rating"] for review in first["items"]] == [4]
+    assert [review["rating"] for review in second["items"]] == [3]
+    assert second["next_cursor"] is None
+
+
+def test_book_reviews_filters(db_client, seeded_db):
+    url = f"{reviews_prefix}/book/{seeded_db['book'].uid}"
+
+    response = db_client.get(url=url, params={"max_rating": 3})
+
+    assert [review["review_text"] for review in response.json()["items"]] == ["good"]
+    assert db_client.get(url=url, params={"since": "2999-01-01T00:00:00"}).json() == {
+        "items": [],
+        "next_cursor": None,
+    }
+
+
+def test_review_filter_since_is_naive_utc():
+    filters = ReviewFilterModel(since="2024-01-01T02:00:00+02:00")
+
+    assert filters.since == datetime(2024, 1, 1)
+
+
+def test_book_reviews_of_unknown_book(db_client):
+    response = db_client.get(url=f"{reviews_prefix}/book/{uuid.uuid4()}")
+
+    assert response.status_code == 404
+
+
+def test_recommendations_follow_co_rated_books():
+    users = [uuid.uuid4() for _ in range(3)]
+    books = [uuid.uuid4() for _ in range(4)]
+    builder = RatingMatrixBuilder()
+    builder.add([(users[0], books[0], 4), (users[0], books[1], 4)])
+    builder.add([(users[1], books[0], 4), (users[1], books[2], 3)])
+    builder.add([(users[2], books[3], 4)])
+    matrix = builder.build()
+
+    assert [book for book, _ in matrix.recommend(0)] == [books[2]]
+    assert [book for book, _ in matrix.recommend(1)] == [books[1]]
+    # nobody else reviewed books[3]
+    assert dict(matrix.recommendations()).keys() == {users[0], users[1]}
+    user_indices, book_indices, _ = matrix.recommendation_arrays()
+    assert [
+        (matrix.user_uids[user], matrix.book_uids[book])
+        for user, book in zip(user_indices, book_indices)
+    ] == [(users[0], books[2]), (users[1], books[1])]
+
+
+def test_me_recommendations_after_rebuild(db_client, db_session_maker, seeded_db):
+    async def rebuild():
+        async with db_session_maker() as session:
+            results = await session.exec(select(User).where(User.username == "critic"))
+            critic = results.one()
+            session.add(
+                Review(
+                    rating=4,
+                    review_text="even better",
+                    user_uid=critic.uid,
+                    book=Book(
+                        title="Fluent Python",
+                        author="Luciano Ramalho",
+                        publisher="O'Reilly Media",
+                        published_date=date(2022, 1, 1),
+                        page_count=792,
+                        language="English",
+                    ),
+                )
+            )
+            await session.commit()
+            return await ReviewService().rebuild_recommendations(session)
+
+    # the critic reviewed every book, so only the reader gets recommendations
+    assert asyncio.run(rebuild()) == 1
+
+    response = db_client.get(url="/api/v1/auth/me/recommendations")
+
+    assert response.status_code == 200
+    assert [item["book"]["title"] for item in response.json()] == ["Fluent Python"]
@@ -0,0 +1,105 @@
+import asyncio
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+from src.books import routes as book_routes
+from src.books.service import BookService
+from src.books.similar import IndexWriter, SimilarIndex
+from src.db.models import Book
+
+books_prefix = "/api/v1/books"
+
+
+def book(title, author, publisher="O'Reilly Media"):
+    return SimpleNamespace(
+        uid=uuid.uuid4(), title=title, author=author, publisher=publisher
+    )
+
+
+def write_index(directory, books):
+    books = sorted(books, key=lambda book: book.uid.bytes)
+    writer = IndexWriter(str(directory), len(books))
+    writer.add([(b.uid, b.title, b.author, b.publisher) for b in books])
+    writer.commit()
+
+
+def test_similar_ranks_by_title_author_and_publisher(tmp_path):
+    python = book("Think Python", "Allen B. Downey")
+    fluent = book("Fluent Python", "Luciano Ramalho")
+    stats = book("Think Stats", "Allen B. Downey")
+    cooking = book("Salt Fat Acid Heat", "Samin Nosrat", "Simon & Schuster")
+    write_index(tmp_path, [python, fluent, stats, cooking])
+
+    ranking = SimilarIndex(str(tmp_path)).similar(python, limit=2)
+
+    assert [uid for uid, _ in ranking] == [stats.uid, fluent.uid]
+    assert 1 > ranking[0][1] > ranking[1][1] > 0
+
+
+def test_similar_vectorizes_books_added_since_the_build(tmp_path):
+    python = book("Think Python", "Allen B. Downey")
+    write_index(tmp_path, [python, book("Salt Fat Acid Heat", "Samin Nosrat", "x")])
+
+    ranking = SimilarIndex(str(tmp_path)).similar(
+        book("Think Python 2", "Allen Downey"), limit=1
+    )
+
+    assert [uid for uid, _ in ranking] == [python.uid]
+
+
+def test_uids_ending_in_nul_bytes_are_found(tmp_path):
+    python = book("Think Python", "Allen B. Downey")
+    python.uid = uuid.UUID(bytes=python.uid.bytes[:14] + b"\0\0")
+    fluent = book("Fluent Python", "Luciano Ramalho")
+    write_index(tmp_path, [python, fluent])
+
+    ranking = SimilarIndex(str(tmp_path)).similar(python, limit=5)
+
+    # found in the index, so left out of its own results
+    assert [uid for uid, _ in ranking] == [fluent.uid]
+    assert [uid for uid, _ in SimilarIndex(str(tmp_path)).similar(fluent, 5)] == [
+        python.uid
+    ]
+
+
+def test_workers_switch_to_a_new_generation(tmp_path):
+    python = book("Think Python", "Allen B. Downey")
+    fluent = book("Fluent Python", "Luciano Ramalho")
+    write_index(tmp_path, [python])
+    index = SimilarIndex(str(tmp_path))
+    assert index.similar(python, limit=5) == []
+
+    write_index(tmp_path, [python, fluent])
+
+    assert [uid for uid, _ in index.similar(python, limit=5)] == [fluent.uid]
+
+
+def test_similar_books_endpoint(
+    db_client, db_session_maker, seeded_db, tmp_path, monkeypatch
+):
+    async def rebuild():
+        async with db_session_maker() as session:
+            session.add(
+                Book(
+                    title="Think Python 2",
+                    author="Allen B. Downey",
+                    publisher="O'Reilly Media",
+                    published_date=date(2022, 1, 1),
+                    page_count=300,
+                    language="English",
+                    user_uid=seeded_db["user"].uid,
+                )
+            )
+            await session.commit()
+            return await BookService().rebuild_similar_index(session, str(tmp_path))
+
+    assert asyncio.run(rebuild()) == 2
+    monkeypatch.setattr(book_routes, "similar_index", SimilarIndex(str(tmp_path)))
+
+    response = db_client.get(url=f"{books_prefix}/{seeded_db['book'].uid}/similar")
+
+    assert response.status_code == 200
+    assert [item["book"]["title"] for item in response.json()] == ["Think Python 2"]
+    unknown = db_client.get(url=f"{books_prefix}/{uuid.uuid4()}/similar")
+    assert unknown.status_code == 404
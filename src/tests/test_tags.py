@@ -0,0 +1,202 @@
+import uuid
+import asyncio
+from sqlalchemy import event
+from sqlmodel import func, select
+
+from src.db.models import Book, BookTag
+
+tags_prefix = "/api/v1/tags"
+
+
+def test_add_tag_twice_conflicts(db_client):
+    first = db_client.post(url=tags_prefix, json={"name": "fiction"})
+    second = db_client.post(url=tags_prefix, json={"name": "fiction"})
+
+    assert first.status_code == 201
+    assert first.json()["created_at"] is not None
+    assert second.status_code == 403
+    assert second.json()["error_code"] == "tag_exists"
+
+
+def test_add_tags_to_book_reuses_existing_tags(db_client, seeded_db, query_counter):
+    book_uid = seeded_db["book"].uid
+
+    response = db_client.post(
+        url=f"{tags_prefix}/book/{book_uid}/tags",
+        json={"tags": [{"name": "python"}, {"name": "programming"}]},
+    )
+
+    assert response.status_code == 200
+    # version bump, tag upsert, existing tag lookup, links, book reload
+    assert len(query_counter) == 5
+    tags = db_client.get(url=f"/api/v1/books/{book_uid}").json()["tags"]
+    assert sorted(tag["name"] for tag in tags) == ["programming", "python"]
+    assert len(db_client.get(url=tags_prefix).json()["items"]) == 2
+
+
+def test_add_tags_to_unknown_book(db_client):
+    response = db_client.post(
+        url=f"{tags_prefix}/book/{uuid.uuid4()}/tags", json={"tags": [{"name": "x"}]}
+    )
+
+    assert response.status_code == 404
+    # rolled back, the tag was not created
+    assert [tag["name"] for tag in db_client.get(url=tags_prefix).json()["items"]] == [
+        "python"
+    ]
+
+
+def test_bulk_tagging_reports_missing_books(db_client, seeded_db):
+    book_uid = str(seeded_db["book"].uid)
+    unknown_uid = str(uuid.uuid4())
+
+    response = db_client.post(
+        url=f"{tags_prefix}/books",
+        json={
+            "book_uids": [book_uid, unknown_uid],
+            "tags": [{"name": "python"}, {"name": "classic"}],
+        },
+    )
+
+    result = response.json()
+    assert response.status_code == 200
+    assert sorted(tag["name"] for tag in result["tags"]) == ["classic", "python"]
+    assert (result["tagged"], result["missing"]) == ([book_uid], [unknown_uid])
+    tags = db_client.get(url=f"/api/v1/books/{book_uid}").json()["tags"]
+    assert sorted(tag["name"] for tag in tags) == ["classic", "python"]
+
+
+def test_bulk_tagging_at_the_schema_maximum(
+    db_client, db_engine, db_session_maker, seeded_db
+):
+    # the most books and tags TagBulkAddModel accepts
+    book_count, tag_count = 1000, 100
+    book = seeded_db["book"]
+
+    async def seed():
+        async with db_session_maker() as session:
+            books = [
+                Book(
+                    title=f"Book {i}",
+                    author=book.author,
+                    publisher=book.publisher,
+                    published_date=book.published_date,
+                    page_count=100,
+                    language="English",
+                    user_uid=book.user_uid,
+                )
+                for i in range(book_count - 1)
+            ]
+            session.add_all(books)
+            await session.commit()
+            return [str(book.uid) for book in books]
+
+    async def count_links():
+        async with db_session_maker() as session:
+            return (await session.exec(select(func.count()).select_from(BookTag))).one()
+
+    book_uids = [str(book.uid), *asyncio.run(seed())]
+    parameter_counts = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        parameter_counts.append(len(parameters))
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count)
+    response = db_client.post(
+        url=f"{tags_prefix}/books",
+        json={
+            "book_uids": book_uids,
+            "tags": [{"name": f"tag {i}"} for i in range(tag_count)],
+        },
+    )
+
+    event.remove(db_engine.sync_engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    assert len(response.json()["tagged"]) == book_count
+    # asyncpg takes at most 32767 bind parameters per statement
+    assert max(parameter_counts) <= 32767
+    # the seeded book keeps its python tag
+    assert asyncio.run(count_links()) == book_count * tag_count + 1
+
+
+def test_list_tags_counts_books_and_pages(db_client, seeded_db):
+    db_client.post(url=tags_prefix, json={"name": "fiction"})
+
+    first = db_client.get(url=tags_prefix, params={"limit": 1}).json()
+    second = db_client.get(
+        url=tags_prefix, params={"limit": 1, "cursor": first["next_cursor"]}
+    ).json()
+
+    assert [(tag["name"], tag["book_count"]) for tag in first["items"]] == [
+        ("fiction", 0)
+    ]
+    assert [(tag["name"], tag["book_count"]) for tag in second["items"]] == [
+        ("python", 1)
+    ]
+    assert second["next_cursor"] is None
+
+
+def test_tag_books_pages_through_tagged_books(db_client, seeded_db):
+    tag_uid = db_client.get(url=tags_prefix).json()["items"][0]["uid"]
+
+    page = db_client.get(url=f"{tags_prefix}/{tag_uid}/books").json()
+
+    assert [book["uid"] for book in page["items"]] == [str(seeded_db["book"].uid)]
+    assert page["next_cursor"] is None
+
+
+def test_tag_books_of_unknown_tag(db_client):
+    response = db_client.get(url=f"{tags_prefix}/{uuid.uuid4()}/books")
+
+    assert response.status_code == 404
+    assert response.json()["error_code"] == "tag_not_found"
+
+
+def test_rename_tagged_tag_to_an_existing_name_conflicts(db_client, seeded_db):
+    db_client.post(url=tags_prefix, json={"name": "fiction"})
+    tags = db_client.get(url=tags_prefix).json()["items"]
+    python_uid = next(tag["uid"] for tag in tags if tag["name"] == "python")
+
+    response = db_client.put(
+        url=f"{tags_prefix}/{python_uid}", json={"name": "fiction"}
+    )
+
+    assert response.status_code == 403
+    assert response.json()["error_code"] == "tag_exists"
+
+
+def test_delete_tagged_tag_runs_set_based_statements(
+    db_client, db_session_maker, seeded_db, query_counter
+):
+    tag_uid = db_client.get(url=tags_prefix).json()["items"][0]["uid"]
+    query_counter.clear()
+
+    response = db_client.delete(url=f"{tags_prefix}/{tag_uid}")
+
+    assert response.status_code == 204
+    # the links, the tag, then the version of the tagged book
+    assert [statement.split()[0] for statement in query_counter] == [
+        "DELETE",
+        "DELETE",
+        "UPDATE",
+    ]
+
+    async def count_links():
+        async with db_session_maker() as session:
+            return (await session.exec(select(func.count()).select_from(BookTag))).one()
+
+    assert asyncio.run(count_links()) == 0
+
+
+def test_rename_tagged_tag_bumps_the_book_version(db_client, seeded_db):
+    tag_uid = db_client.get(url=tags_prefix).json()["items"][0]["uid"]
+    book_url = f"/api/v1/books/{seeded_db['book'].uid}"
+    version = db_client.get(url=book_url).json()["version"]
+
+    response = db_client.put(url=f"{tags_prefix}/{tag_uid}", json={"name": "py"})
+
+    assert response.status_code == 200
+    book = db_client.get(url=book_url).json()
+    assert book["version"] == version + 1
+    assert [tag["name"] for tag in book["tags"]] == ["py"]
@@ -0,0 +1,62 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, Mock
+from redis.exceptions import RedisError
+
+from src.books.service import BookService
+from src.books.views import VIEW_BUCKET_SECONDS, drain_pending_views, window_weights
+from src.db.redis import cache_client
+
+
+async def collect(batches):
+    return [batch async for batch in batches]
+
+
+def test_window_weights_halve_every_quarter_window():
+    now = 1000 * VIEW_BUCKET_SECONDS + 5
+    weights = window_weights("day", now)
+
+    assert len(weights) == 24
+    assert weights[1000] == 1
+    assert weights[1000 - 6] == 0.5
+    assert min(weights) == 1000 - 23
+
+
+def test_flush_views_adds_counts_to_books(db_session_maker, seeded_db, monkeypatch):
+    book_uid = seeded_db["book"].uid
+
+    async def drain_pending_views():
+        yield {book_uid: 3, uuid.uuid4(): 1}
+        yield {book_uid: 2}
+
+    monkeypatch.setattr("src.books.service.drain_pending_views", drain_pending_views)
+
+    async def run():
+        async with db_session_maker() as session:
+            flushed = await BookService().flush_views(session)
+            book = await BookService().get_book(book_uid, session)
+            return flushed, book.view_count
+
+    assert asyncio.run(run()) == (6, 5)
+
+
+def test_trending_is_empty_while_redis_is_down(db_client, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise RedisError("Connection refused")
+
+    monkeypatch.setattr(cache_client, "exists", unreachable)
+
+    response = db_client.get(url="/api/v1/books/trending")
+
+    assert (response.status_code, response.json()) == (200, [])
+
+
+def test_flush_waits_for_the_running_one(monkeypatch):
+    lock = Mock(acquire=AsyncMock(return_value=False))
+    monkeypatch.setattr(cache_client, "lock", Mock(return_value=lock))
+    monkeypatch.setattr(cache_client, "rename", AsyncMock())
+
+    batches = asyncio.run(collect(drain_pending_views()))
+
+    assert batches == []
+    cache_client.rename.assert_not_called()